@@ -7,10 +7,99 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core import signals
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.http import FileResponse
+from django.urls import set_script_prefix
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+
+class DisconnectAwareASGIHandler(ASGIHandler):
+    """
+    Django 4.2's handler keeps running a view after its client has gone.
+    Like Django 5.0's, this one listens for http.disconnect while the
+    response is computed and cancels the view, so async views (search
+    waiting on the geocoder) stop working for nobody. It keeps listening
+    while a streaming response is sent, so a live message stream whose
+    browser went away stops at once instead of at its next timeout.
+    """
+
+    async def handle(self, scope, receive, send):
+        try:
+            body_file = await self.read_body(receive)
+        except RequestAborted:
+            return
+        set_script_prefix(self.get_script_prefix(scope))
+        await sync_to_async(
+            signals.request_started.send, thread_sensitive=True
+        )(sender=self.__class__, scope=scope)
+        request, error_response = self.create_request(scope, body_file)
+        if request is None:
+            body_file.close()
+            await self.send_response(error_response, send)
+            return
+
+        view = asyncio.ensure_future(self.get_response_async(request))
+        listener = asyncio.ensure_future(self.listen_for_disconnect(receive))
+        await asyncio.wait(
+            [view, listener], return_when=asyncio.FIRST_COMPLETED
+        )
+        if not view.done():
+            view.cancel()
+            try:
+                await view
+            except asyncio.CancelledError:
+                pass
+            body_file.close()
+
+            # No response to close, so end the request here (this closes
+            # the request's database connections)
+
+            await sync_to_async(
+                signals.request_finished.send, thread_sensitive=True
+            )(sender=self.__class__)
+            return
+
+        response = view.result()
+        response._handler_class = self.__class__
+        if isinstance(response, FileResponse):
+            response.block_size = self.chunk_size
+        if not response.streaming or listener.done():
+            listener.cancel()
+            await self.send_response(response, send)
+            return
+
+        sender = asyncio.ensure_future(self.send_response(response, send))
+        await asyncio.wait(
+            [sender, listener], return_when=asyncio.FIRST_COMPLETED
+        )
+        listener.cancel()
+        if sender.done():
+            sender.result()
+            return
+        sender.cancel()
+        try:
+            await sender
+        except asyncio.CancelledError:
+            pass
+
+        # send_response() closes the response only after the last chunk
+
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    async def listen_for_disconnect(self, receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+
+django.setup(set_prefix=False)
+application = DisconnectAwareASGIHandler()
@@ -83,6 +83,10 @@ AUTHENTICATION_BACKENDS = [
 
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    "skills.metrics.RequestMetricsMiddleware",
+    # Before sessions, so session saves count as writes for the replica pin
+    "skills.replicas.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -94,6 +98,13 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
 ]
 
+# Request metrics: samples kept per URL name for the rolling percentiles
+# (staff can read them at /metrics/requests/), and whether to send a
+# Server-Timing header with each response's wall, SQL and geocoder time
+
+REQUEST_METRICS_WINDOW = 1000
+REQUEST_METRICS_SERVER_TIMING = DEBUG
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -107,6 +118,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "skills.context_processors.unread_messages",
             ],
         },
     },
@@ -127,6 +139,51 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 
 DATABASES = {"default": dj_database_url.parse(os.environ.get("DATABASE_URL"))}
+DATABASE_IS_POSTGRES = DATABASES["default"]["ENGINE"].startswith(
+    "django.db.backends.postgresql"
+)
+
+# Read replicas: comma-separated URLs in DATABASE_REPLICA_URLS become the
+# aliases replica1, replica2, ... (two SQLite files work locally; copy the
+# primary over with `manage.py sync_replicas`). Tests read through the
+# default test database instead.
+
+REPLICA_DATABASES = []
+for i, url in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), 1
+):
+    DATABASES[f"replica{i}"] = dj_database_url.parse(url.strip())
+    DATABASES[f"replica{i}"]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASES.append(f"replica{i}")
+
+DATABASE_ROUTERS = ["skills.replicas.ReplicaRouter"]
+
+# Longest replica lag tolerated: a browser that wrote reads from the primary
+# for this long, and searches read from a replica are cached no longer
+
+REPLICA_MAX_LAG = 10  # seconds
+
+# Caches
+# "default" is per process: rendered fragments and other entries whose keys
+# carry their own version. "shared" holds what every process must agree on
+# (catalog and search versions); on PostgreSQL deployments it is the
+# database (`manage.py createcachetable`), while SQLite development runs a
+# single process.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+}
+if DATABASE_IS_POSTGRES:
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "skills_cache",
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -171,8 +228,115 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
+# Uploaded images (listing photos, profile images)
+# Uploads are staged in the database (ImageUpload rows) and stored in the
+# background by `manage.py process_image_uploads` with
+# "skills.images.CloudinaryImageBackend", or "skills.images.LocalImageBackend"
+# to keep images and thumbnails on disk (offline development and tests)
+
+IMAGE_STORAGE_BACKEND = "skills.images.CloudinaryImageBackend"
+IMAGE_LOCAL_ROOT = os.path.join(BASE_DIR, "media", "images")
+IMAGE_LOCAL_URL = "/media/images/"
+
+# Fixed-size thumbnails made for every image: name -> (width, height)
+
+IMAGE_THUMBNAIL_SIZES = {
+    "card": (300, 300),  # search result cards
+    "carousel": (800, 500),  # listing detail carousel
+}
+IMAGE_UPLOAD_BATCH_SIZE = 20
+IMAGE_UPLOAD_MAX_ATTEMPTS = 5
+IMAGE_UPLOAD_LEASE = 300  # seconds
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Search
+# Distance engine used by radius search: "haversine" (NumPy batch) or
+# "geodesic" (exact, slow), or a dotted path to a custom engine class.
+
+DISTANCE_ENGINE = "haversine"
+
+# Re-rank the listings inside the radius with exact geodesic distances
+
+DISTANCE_EXACT_RANKING = False
+
+# Seconds a process trusts the catalog / search versions it last read from
+# the "shared" cache; bumps made by other processes show up this late
+
+SHARED_VERSION_TTL = 5
+
+# Seconds a process may serve its cached skill dropdown before rebuilding
+# it even though the shared catalog version is unchanged
+
+SKILL_CATALOG_TTL = 300
+
+# Cached searches (ordered listing ids + distances), dropped whenever a
+# listing, review or location changes
+
+SEARCH_CACHE_TIMEOUT = 300  # seconds
+SEARCH_CACHE_MAX_RESULTS = 2000
+
+# Listing card / detail header fragments (keys carry Listing.version)
+
+FRAGMENT_CACHE_TIMEOUT = 3600  # seconds
+
+# Entries kept in the per-process (origin, location) -> distance memo
+
+DISTANCE_MEMO_SIZE = 50000
+
+
+# Geocoding
+# Backends are tried in order, local ones (no network) before the geocode
+# cache and remote ones after it. Use "skills.geocoding.LocalBackend" with
+# GEOCODER_LOCAL_PLACES for tests and offline development.
+
+GEOCODER_BACKENDS = [
+    "skills.geocoding.GazetteerBackend",
+    "skills.geocoding.NominatimBackend",
+]
+GEOCODER_USER_AGENT = "skillshop"
+GEOCODER_TIMEOUT = 5  # seconds
+GEOCODER_MIN_INTERVAL = 1.0  # seconds between Nominatim requests
+GEOCODER_LOCAL_PLACES = {}
+
+# The async search view waits this long for a remote lookup; the lookups
+# themselves run on a small per-process thread pool
+
+GEOCODER_ASYNC_TIMEOUT = 3.0  # seconds
+GEOCODER_REMOTE_WORKERS = 4
+
+# Built from a gazetteer CSV with `manage.py build_gazetteer`
+
+GAZETTEER_INDEX_PATH = os.path.join(BASE_DIR, "gazetteer.idx")
+
+GEOCODE_LRU_SIZE = 2048
+GEOCODE_CACHE_TTL = 30 * 24 * 3600  # found places, seconds
+GEOCODE_NEGATIVE_TTL = 24 * 3600  # misses, seconds
+
+# Background geocoding of listing locations (`manage.py process_geocode_jobs`)
+
+GEOCODE_JOB_BATCH_SIZE = 50
+GEOCODE_JOB_MAX_ATTEMPTS = 5
+GEOCODE_JOB_LEASE = 300  # seconds a claimed job is hidden from other workers
+
+
+# Live messages
+# Pub/sub used to wake message streams. LocalBroker is in-process only, so
+# PostgreSQL deployments (several workers/dynos) use LISTEN/NOTIFY
+
+if DATABASE_IS_POSTGRES:
+    MESSAGE_BROKER = "skills.pubsub.PostgresBroker"
+else:
+    MESSAGE_BROKER = "skills.pubsub.LocalBroker"
+MESSAGE_STREAM_KEEPALIVE = 15  # seconds between keep-alives / re-polls
+MESSAGE_STREAM_MAX_SECONDS = 300  # the browser reconnects after this
+MESSAGE_STREAM_RETRY_MS = 3000
+
+# Messages per page of conversation history (older pages load on request)
+
+MESSAGES_PAGE_SIZE = 50
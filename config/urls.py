@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include # import include function to include urls from other apps
 from django.contrib.auth import views as auth_views
@@ -25,4 +27,10 @@ urlpatterns = [
     path("", include("skills.urls"), name="skills_urls"),
 ]
 
+# Images kept on disk by LocalImageBackend (development only)
+
+urlpatterns += static(
+    settings.IMAGE_LOCAL_URL, document_root=settings.IMAGE_LOCAL_ROOT
+)
+
 
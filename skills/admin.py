@@ -1,6 +1,15 @@
 from django.contrib import admin
 from django_summernote.admin import SummernoteModelAdmin
-from .models import Profile, Skill, Listing, Location, Review
+from .models import (
+    Profile,
+    Skill,
+    Listing,
+    Location,
+    Review,
+    GeocodeCache,
+    GeocodeJob,
+    ImageUpload,
+)
 
 # Register your models here.
 
@@ -28,3 +37,27 @@ class LocationAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(SummernoteModelAdmin):
     summernote_fields = ("listing", "reviewer")
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ("query", "latitude", "longitude", "updated_at")
+    search_fields = ("query",)
+
+
+@admin.register(GeocodeJob)
+class GeocodeJobAdmin(admin.ModelAdmin):
+    list_display = ("query", "listing", "attempts", "run_after", "last_error")
+    search_fields = ("query",)
+
+
+@admin.register(ImageUpload)
+class ImageUploadAdmin(admin.ModelAdmin):
+    list_display = (
+        "content_type",
+        "object_id",
+        "field_name",
+        "attempts",
+        "run_after",
+        "last_error",
+    )
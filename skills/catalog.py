@@ -0,0 +1,71 @@
+"""
+Process-local cache of the skill dropdown used by ListingForm (and so by
+every search page).
+
+Each process keeps the prebuilt choice lists for the normal and search_mode
+forms, tagged with a catalog version (see skills.versions). Saving or
+deleting a Skill stores a new version, so every process rebuilds once it
+sees it. Lists older than SKILL_CATALOG_TTL are rebuilt regardless, and a
+bound form whose submitted skill is missing rebuilds from the database.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+from .versions import VersionedNamespace
+
+NEW_SKILL_VALUE = "__new__"
+
+namespace = VersionedNamespace("skills:catalog-version")
+
+_lock = threading.Lock()
+_local = {"version": None, "expires": 0.0, "choices": None}
+
+
+def invalidate():
+    """Retire every process' cached catalog."""
+    namespace.bump()
+    with _lock:
+        _local["version"] = None
+
+
+def _build():
+    from .models import Skill
+
+    skills = [
+        (str(pk), name)
+        for pk, name in Skill.objects.order_by("name").values_list(
+            "id", "name"
+        )
+    ]
+    base = [("", "Select a skill…")] + skills
+    return {
+        False: tuple(base + [(NEW_SKILL_VALUE, "Other / New skill…")]),
+        True: tuple(base),  # search_mode: no "new skill" option
+    }
+
+
+def skill_choices(search_mode=False, refresh=False):
+    """
+    Return the skill dropdown choices, rebuilt only when skills change (or
+    with refresh=True, straight from the database).
+    """
+    version = namespace.current()
+    with _lock:
+        if (
+            not refresh
+            and _local["version"] == version
+            and _local["expires"] > time.monotonic()
+        ):
+            return _local["choices"][search_mode]
+    choices = _build()
+    with _lock:
+        _local.update(
+            version=version,
+            expires=time.monotonic()
+            + getattr(settings, "SKILL_CATALOG_TTL", 300),
+            choices=choices,
+        )
+    return choices[search_mode]
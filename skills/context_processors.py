@@ -0,0 +1,24 @@
+from django.db.models import Sum
+from django.utils.functional import SimpleLazyObject
+
+from .models import UnreadCounter
+
+
+def unread_messages(request):
+    """
+    Expose `unread_total` for the nav bar badge. Evaluated lazily, and read
+    from the per-thread counters rather than the Message table.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+
+    def total():
+        return (
+            UnreadCounter.objects.filter(
+                profile__user_id=user.id, count__gt=0
+            ).aggregate(total=Sum("count"))["total"]
+            or 0
+        )
+
+    return {"unread_total": SimpleLazyObject(total)}
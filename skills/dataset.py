@@ -0,0 +1,414 @@
+"""
+Deterministic synthetic data for profiling and performance tests.
+
+generate() fills the database with users and profiles, skills, locations
+spread over a real coordinate range, listings, reviews and conversations
+with messages. How many listings each location gets, reviews each listing
+gets and so on are drawn from distributions given as short specs:
+
+    "3"              always 3
+    "uniform:0:10"   0 to 10 inclusive
+    "poisson:4"      Poisson with mean 4
+    "geometric:4"    geometric (long tail) with mean 4
+    "zipf:2"         Zipf with exponent 2 (a few very popular, most rare)
+
+Rows are written with bulk_create in batches, so signals do not run: the
+stored rating stats, conversation participants, last messages and unread
+counters are filled in directly, and the search index and caches are
+rebuilt once at the end. The same seed and options always produce the same
+data.
+"""
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from . import catalog, search_cache, search_index
+from .models import (
+    Conversation,
+    Listing,
+    Location,
+    Message,
+    Profile,
+    Review,
+    Skill,
+    UnreadCounter,
+)
+
+# (min_lat, max_lat, min_lon, max_lon)
+
+REGIONS = {
+    "uk": (50.0, 58.6, -5.7, 1.7),
+    # About 100 x 100 miles around (52.5, -1.5), dense enough for 25-mile
+    # searches to have realistic candidate sets (bench_search)
+    "midlands": (51.78, 53.22, -2.69, -0.31),
+    "europe": (36.0, 60.0, -9.5, 30.0),
+    "world": (-45.0, 65.0, -180.0, 180.0),
+}
+
+FIRST_NAMES = [
+    "Amira", "Ben", "Chloe", "Dev", "Ella", "Farah", "George", "Hana",
+    "Isaac", "Jade", "Kwame", "Lena", "Mo", "Nina", "Oscar", "Priya",
+    "Quinn", "Rosa", "Sam", "Tariq", "Uma", "Viktor", "Wen", "Yusuf",
+]
+LAST_NAMES = [
+    "Ahmed", "Baker", "Chen", "Davies", "Evans", "Fischer", "Garcia",
+    "Hughes", "Iqbal", "Jones", "Khan", "Lewis", "Murphy", "Nowak",
+    "O'Brien", "Patel", "Roberts", "Singh", "Taylor", "Walker", "Young",
+]
+SKILL_NAMES = [
+    "Guitar", "Piano", "Violin", "Singing", "Yoga", "Pilates", "Plumbing",
+    "Electrics", "Carpentry", "Painting", "Gardening", "Cooking", "Baking",
+    "Photography", "Spanish", "French", "Mandarin", "Maths Tutoring",
+    "Physics Tutoring", "Coding", "Web Design", "Knitting", "Sewing",
+    "Pottery", "Dog Training", "Personal Training", "Swimming", "Chess",
+    "Dance", "Drawing",
+]
+SKILL_LEVELS = ["Beginner", "Intermediate", "Advanced", "Kids", "Group"]
+PLACE_PARTS = (
+    ["Ash", "Brook", "Clay", "Dun", "Elm", "Fern", "Glen", "Hart", "Kings",
+     "Long", "Mill", "North", "Oak", "Red", "Stan", "West", "Whit"],
+    ["bury", "by", "combe", "field", "ford", "ham", "ley", "mouth", "stead",
+     "ton", "wick", "worth"],
+)
+DESCRIPTIONS = [
+    "Friendly {skill} lessons for all ages, in person or online.",
+    "Experienced {skill} teacher offering flexible weekday sessions.",
+    "{skill} help from a qualified professional. First session half price.",
+    "Patient, practical {skill} coaching tailored to your goals.",
+]
+MESSAGE_BODIES = [
+    "Hi, is this still available?",
+    "Yes it is! When would suit you?",
+    "Would Tuesday evening work?",
+    "Tuesday is fine, see you at 6.",
+    "Thanks, looking forward to it.",
+    "Could we move it to next week?",
+]
+
+# Star ratings skew positive, as on most review sites
+
+RATING_WEIGHTS = [0.04, 0.06, 0.15, 0.35, 0.40]
+
+
+class Distribution:
+    """A distribution of non-negative counts parsed from a spec string."""
+
+    def __init__(self, spec):
+        self.spec = str(spec)
+        kind, *args = self.spec.split(":")
+        try:
+            if not args:
+                self.kind, self.args = "const", (int(kind),)
+            else:
+                self.kind, self.args = kind, tuple(float(a) for a in args)
+        except ValueError:
+            raise ValueError(f"Bad distribution spec {spec!r}")
+        expected = {"const": 1, "uniform": 2, "poisson": 1, "geometric": 1}
+        if self.kind not in expected and self.kind != "zipf":
+            raise ValueError(f"Unknown distribution {self.kind!r} in {spec!r}")
+        if self.kind in expected and len(self.args) != expected[self.kind]:
+            raise ValueError(f"Wrong number of parameters in {spec!r}")
+
+    def sample(self, rng, size):
+        """Return an int array of size draws."""
+        if self.kind == "const":
+            return np.full(size, self.args[0], dtype=np.int64)
+        if self.kind == "uniform":
+            low, high = self.args
+            return rng.integers(int(low), int(high) + 1, size)
+        if self.kind == "poisson":
+            return rng.poisson(self.args[0], size)
+        if self.kind == "geometric":
+            # Shifted to start at 0 so the mean is the given value
+
+            return rng.geometric(1 / (self.args[0] + 1), size) - 1
+        # zipf:a[:max], starting at 0
+
+        draws = rng.zipf(self.args[0], size) - 1
+        if len(self.args) > 1:
+            draws = np.minimum(draws, int(self.args[1]))
+        return draws
+
+    def __repr__(self):
+        return f"Distribution({self.spec!r})"
+
+
+def _distribution(spec):
+    return spec if isinstance(spec, Distribution) else Distribution(spec)
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _bulk(model, objs, batch_size):
+    created = []
+    for batch in _batches(objs, batch_size):
+        created.extend(model.objects.bulk_create(batch))
+    return created
+
+
+def generate(
+    *,
+    seed=0,
+    users=1000,
+    provider_share=0.3,
+    skills=40,
+    locations=200,
+    region="uk",
+    listings_per_location="poisson:5",
+    reviews_per_listing="geometric:3",
+    threads_per_listing="poisson:1",
+    messages_per_thread="poisson:8",
+    prefix="seed",
+    batch_size=2000,
+    log=None,
+):
+    """
+    Write a synthetic dataset and return a dict of row counts per model.
+    Usernames start with prefix, so several datasets can share a database
+    as long as their prefixes differ.
+    """
+    rng = np.random.default_rng(seed)
+    listings_dist = _distribution(listings_per_location)
+    reviews_dist = _distribution(reviews_per_listing)
+    threads_dist = _distribution(threads_per_listing)
+    messages_dist = _distribution(messages_per_thread)
+    min_lat, max_lat, min_lon, max_lon = REGIONS[region]
+    log = log or (lambda message: None)
+    counts = dict.fromkeys(
+        [
+            "profiles",
+            "skills",
+            "locations",
+            "listings",
+            "reviews",
+            "conversations",
+            "messages",
+        ],
+        0,
+    )
+
+    # Users and profiles (bulk_create skips the create_profile signal)
+
+    with transaction.atomic():
+        user_objs = _bulk(
+            User,
+            [
+                User(username=f"{prefix}_{i:07d}", password="!")
+                for i in range(users)
+            ],
+            batch_size,
+        )
+        firsts = rng.integers(0, len(FIRST_NAMES), users)
+        lasts = rng.integers(0, len(LAST_NAMES), users)
+        is_provider = rng.random(users) < provider_share
+        profiles = _bulk(
+            Profile,
+            [
+                Profile(
+                    user=user,
+                    first_name=FIRST_NAMES[firsts[i]],
+                    last_name=LAST_NAMES[lasts[i]],
+                    is_provider=bool(is_provider[i]),
+                )
+                for i, user in enumerate(user_objs)
+            ],
+            batch_size,
+        )
+    profile_ids = np.array([p.id for p in profiles])
+    provider_ids = profile_ids[is_provider]
+    if not len(provider_ids) or len(profile_ids) < 2:
+        raise ValueError("Need at least two users and one provider.")
+    counts["profiles"] = len(profiles)
+    log(f"{len(profiles)} profiles ({len(provider_ids)} providers)")
+
+    # Skills: real names first, then levels of them, then numbered ones
+
+    names = list(SKILL_NAMES)
+    names += [
+        f"{level} {name}" for level in SKILL_LEVELS for name in SKILL_NAMES
+    ]
+    names = names[:skills] + [
+        f"{SKILL_NAMES[i % len(SKILL_NAMES)]} {i}"
+        for i in range(len(names), skills)
+    ]
+    Skill.objects.bulk_create(
+        [Skill(name=name) for name in names], ignore_conflicts=True
+    )
+    skill_by_name = dict(
+        Skill.objects.filter(name__in=names).values_list("name", "id")
+    )
+    skill_ids = np.array([skill_by_name[name] for name in names])
+    skill_names = {skill_by_name[name]: name for name in names}
+    counts["skills"] = len(skill_ids)
+
+    # Locations spread uniformly over the region
+
+    lats = rng.uniform(min_lat, max_lat, locations)
+    lons = rng.uniform(min_lon, max_lon, locations)
+    heads = rng.integers(0, len(PLACE_PARTS[0]), locations)
+    tails = rng.integers(0, len(PLACE_PARTS[1]), locations)
+    location_objs = _bulk(
+        Location,
+        [
+            Location(
+                name=(
+                    f"{PLACE_PARTS[0][heads[i]]}{PLACE_PARTS[1][tails[i]]} "
+                    f"{i}"
+                ),
+                latitude=round(float(lats[i]), 6),
+                longitude=round(float(lons[i]), 6),
+            )
+            for i in range(locations)
+        ],
+        batch_size,
+    )
+    counts["locations"] = len(location_objs)
+    log(f"{len(skill_ids)} skills, {len(location_objs)} locations")
+
+    # Listings, with their reviews and conversations, one batch at a time
+
+    per_location = listings_dist.sample(rng, locations)
+    location_of = np.repeat([loc.id for loc in location_objs], per_location)
+    weights = np.array(RATING_WEIGHTS)
+    for batch in _batches(location_of, batch_size):
+        n = len(batch)
+        providers = rng.choice(provider_ids, n)
+        skills_for = rng.choice(skill_ids, n)
+        prices = rng.integers(10, 81, n)
+        templates = rng.integers(0, len(DESCRIPTIONS), n)
+        review_counts = np.minimum(
+            reviews_dist.sample(rng, n), len(profile_ids) - 1
+        )
+        thread_counts = np.minimum(
+            threads_dist.sample(rng, n), len(profile_ids) - 1
+        )
+
+        listing_objs = []
+        reviews = []
+        threads = []
+        for i in range(n):
+            provider = int(providers[i])
+            others = rng.choice(
+                profile_ids,
+                int(max(review_counts[i], thread_counts[i])) + 1,
+                replace=False,
+            )
+            others = [int(p) for p in others if p != provider]
+            ratings = rng.choice(5, int(review_counts[i]), p=weights) + 1
+            listing = Listing(
+                provider_id=provider,
+                skill_id=int(skills_for[i]),
+                location_id=int(batch[i]),
+                description=DESCRIPTIONS[templates[i]].format(
+                    skill=skill_names[int(skills_for[i])]
+                ),
+                price=int(prices[i]),
+                rating_sum=int(ratings.sum()),
+                review_count=len(ratings),
+            )
+            listing_objs.append(listing)
+            reviews.append(list(zip(others, ratings)))
+            threads.append(others[: int(thread_counts[i])])
+
+        with transaction.atomic():
+            Listing.objects.bulk_create(listing_objs)
+            review_objs = [
+                Review(
+                    listing=listing,
+                    reviewer_id=reviewer,
+                    rating=int(rating),
+                    comment="Great session, would recommend.",
+                )
+                for listing, rows in zip(listing_objs, reviews)
+                for reviewer, rating in rows
+            ]
+            _bulk(Review, review_objs, batch_size)
+            counts["messages"] += _create_threads(
+                rng, listing_objs, threads, messages_dist, batch_size
+            )
+        counts["listings"] += n
+        counts["reviews"] += len(review_objs)
+        counts["conversations"] += sum(len(t) for t in threads)
+        log(
+            f"{counts['listings']} listings, {counts['reviews']} reviews, "
+            f"{counts['conversations']} conversations, "
+            f"{counts['messages']} messages"
+        )
+
+    # Derived state that signals would normally maintain
+
+    newest = Message.objects.filter(conversation=OuterRef("pk")).order_by(
+        "-created_at", "-id"
+    )
+    Conversation.objects.filter(last_message__isnull=True).update(
+        last_message=Subquery(newest.values("id")[:1])
+    )
+    search_index.rebuild()
+    catalog.invalidate()
+    search_cache.invalidate()
+    return counts
+
+
+def _create_threads(rng, listings, clients, messages_dist, batch_size):
+    """Create conversations with their messages; returns the message count."""
+    convs = []
+    pairs = []
+    for listing, listing_clients in zip(listings, clients):
+        for client in listing_clients:
+            low, high = sorted((client, listing.provider_id))
+            convs.append(
+                Conversation(
+                    listing=listing,
+                    participant_low_id=low,
+                    participant_high_id=high,
+                )
+            )
+            pairs.append((client, listing.provider_id))
+    if not convs:
+        return 0
+    _bulk(Conversation, convs, batch_size)
+
+    Through = Conversation.participants.through
+    _bulk(
+        Through,
+        [
+            Through(conversation_id=conv.id, profile_id=profile)
+            for conv, pair in zip(convs, pairs)
+            for profile in pair
+        ],
+        batch_size,
+    )
+    _bulk(
+        UnreadCounter,
+        [
+            UnreadCounter(conversation_id=conv.id, profile_id=profile)
+            for conv, pair in zip(convs, pairs)
+            for profile in pair
+        ],
+        batch_size,
+    )
+
+    # Threads alternate client, provider, client...; all already read
+
+    lengths = messages_dist.sample(rng, len(convs))
+    bodies = rng.integers(0, len(MESSAGE_BODIES), int(lengths.sum()))
+    messages = []
+    k = 0
+    for conv, pair, length in zip(convs, pairs, lengths):
+        for j in range(int(length)):
+            messages.append(
+                Message(
+                    conversation_id=conv.id,
+                    sender_id=pair[j % 2],
+                    body=MESSAGE_BODIES[bodies[k]],
+                    is_read=True,
+                )
+            )
+            k += 1
+    _bulk(Message, messages, batch_size)
+    return len(messages)
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from .catalog import NEW_SKILL_VALUE, skill_choices
 from .models import Profile, Listing, Skill, Review, Message
 
 # Create your forms here.
@@ -29,9 +30,6 @@ class ProfileForm(forms.ModelForm):
         }
 
 
-NEW_SKILL_VALUE = "__new__"
-
-
 class ListingForm(forms.ModelForm):
     location_text = forms.CharField(
         required=True,
@@ -65,16 +63,16 @@ class ListingForm(forms.ModelForm):
         search_mode = kwargs.pop("search_mode", False)
         super().__init__(*args, **kwargs)
 
-        # Build dropdown choices from Skill table + add "Other/New skill..."
+        # Dropdown choices come prebuilt from the cached skill catalog
+        # (with "Other/New skill..." except in search mode)
 
-        skill_choices = [
-            (str(s.id), s.name) for s in Skill.objects.order_by("name")
-        ]
-        skill_choices.append((NEW_SKILL_VALUE, "Other / New skill…"))
+        choices = skill_choices(search_mode)
+        submitted = self.data.get(self.add_prefix("skill_choice"))
+        if submitted and submitted not in dict(choices):
+            # Possibly added by another process since the catalog was built
 
-        self.fields["skill_choice"].choices = [
-            ("", "Select a skill…")
-        ] + skill_choices
+            choices = skill_choices(search_mode, refresh=True)
+        self.fields["skill_choice"].choices = choices
 
         # Make dropdown look like Bootstrap input
 
@@ -93,14 +91,6 @@ class ListingForm(forms.ModelForm):
             # Hide the new skill field
 
             self.fields["new_skill"].widget = forms.HiddenInput()
-            # # Remove the "__new__" option
-
-            filtered = [
-                c
-                for c in self.fields["skill_choice"].choices
-                if c[0] != NEW_SKILL_VALUE
-            ]
-            self.fields["skill_choice"].choices = filtered
             # ⭐ Allow empty selection (prevents "This field is required")
 
             self.fields["skill_choice"].required = False
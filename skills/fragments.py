@@ -0,0 +1,64 @@
+"""
+Cached HTML fragments for listing cards.
+
+A card's cache key carries the listing's version stamp (Listing.version,
+bumped by edits, reviews and provider/skill renames), so stale cards are
+never served and nothing needs deleting. A whole results page is fetched
+with one get_many() and the missing cards are written back with one
+set_many().
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.defaultfilters import floatformat
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = "skills/includes/listing_card.html"
+DISTANCE_SLOT = "<!--distance-->"
+
+
+def card_key(listing_id, version):
+    return f"skills:card:{listing_id}:{version}"
+
+
+def distance_badge(miles):
+    if miles is None:
+        return ""
+    return format_html(
+        '<span class="badge text-bg-secondary">{} miles</span>',
+        floatformat(miles, 1),
+    )
+
+
+def render_listing_cards(entries, load_listings):
+    """
+    Return the HTML card for each (listing_id, version, miles) entry, in
+    order. load_listings(ids) must return {id: Listing} (with skill, provider
+    and location loaded) and is only called for cards not in the cache.
+    """
+    keys = [card_key(listing_id, version) for listing_id, version, _ in entries]
+    html = cache.get_many(keys)
+
+    missing = [
+        listing_id
+        for (listing_id, _, _), key in zip(entries, keys)
+        if key not in html
+    ]
+    if missing:
+        fresh = {}
+        for listing in load_listings(missing).values():
+            fresh[card_key(listing.id, listing.version)] = render_to_string(
+                CARD_TEMPLATE, {"listing": listing}
+            )
+        cache.set_many(
+            fresh, getattr(settings, "FRAGMENT_CACHE_TIMEOUT", 3600)
+        )
+        html.update(fresh)
+
+    return [
+        mark_safe(html[key].replace(DISTANCE_SLOT, distance_badge(miles), 1))
+        for (_, _, miles), key in zip(entries, keys)
+        if key in html
+    ]
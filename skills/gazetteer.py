@@ -0,0 +1,103 @@
+"""
+Compact on-disk gazetteer for offline geocoding.
+
+The index is a flat file of fixed-size records sorted by key, read through
+mmap. Lookups are a binary search over the mapped pages, and every worker
+process maps the same file, so the OS page cache holds one shared copy.
+
+Layout (little endian):
+
+    header:  8-byte magic, uint32 record count, uint32 key size
+    records: key (UTF-8, NUL padded to key size), float64 lat, float64 lon
+"""
+
+import mmap
+import os
+import struct
+
+MAGIC = b"SKGAZ01\0"
+HEADER = struct.Struct("<8sII")
+COORDS = struct.Struct("<dd")
+DEFAULT_KEY_SIZE = 48
+
+
+def build_index(rows, path, key_size=DEFAULT_KEY_SIZE):
+    """
+    Write (key, latitude, longitude) rows to an index file at path.
+
+    Keys must already be normalized. The first row wins for duplicate keys,
+    and keys longer than key_size bytes are skipped. The file is written
+    beside path and moved into place, so processes reading the old index are
+    never disturbed. Returns (written, skipped).
+    """
+    records = {}
+    skipped = 0
+    for key, lat, lon in rows:
+        encoded = key.encode("utf-8")
+        if not encoded or len(encoded) > key_size:
+            skipped += 1
+            continue
+        if encoded in records:
+            skipped += 1
+            continue
+        records[encoded] = (float(lat), float(lon))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(records), key_size))
+        for encoded in sorted(records):
+            fh.write(encoded.ljust(key_size, b"\0"))
+            fh.write(COORDS.pack(*records[encoded]))
+    os.replace(tmp_path, path)
+    return len(records), skipped
+
+
+class GazetteerIndex:
+    """Read-only view of an index file built by build_index."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as fh:
+            self.stat = os.fstat(fh.fileno())
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.key_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a gazetteer index")
+        self.record_size = self.key_size + COORDS.size
+
+    def __len__(self):
+        return self.count
+
+    def is_stale(self):
+        """True when the file at path has been rebuilt since it was mapped."""
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return True
+        return (current.st_ino, current.st_mtime_ns) != (
+            self.stat.st_ino,
+            self.stat.st_mtime_ns,
+        )
+
+    def lookup(self, key):
+        """Return (latitude, longitude) for a normalized key, or None."""
+        target = key.encode("utf-8")
+        if not target or len(target) > self.key_size:
+            return None
+        target = target.ljust(self.key_size, b"\0")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * self.record_size
+            probe = self._map[offset : offset + self.key_size]
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return COORDS.unpack_from(self._map, offset + self.key_size)
+        return None
+
+    def close(self):
+        self._map.close()
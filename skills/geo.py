@@ -0,0 +1,250 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from geopy.distance import geodesic
+
+# Mean Earth radius in miles (the unit used throughout search)
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Spherical and ellipsoidal distances differ by up to ~0.5%, so pad the box
+# to never drop a listing the exact distance would keep
+
+BOX_MARGIN = 1.01
+
+# Origins are rounded to this many decimals (~100 m) when memoising distances
+
+ORIGIN_PRECISION = 3
+
+# Furthest a rounded origin can be from the real one (half a unit in both
+# coordinates), in miles
+
+ORIGIN_SLACK_MILES = 0.05
+
+
+def bounding_box(lat, lon, radius_miles):
+    """
+    Return the (min_lat, max_lat, lon_ranges) box enclosing a circle of
+    radius_miles around (lat, lon).
+
+    lon_ranges is a list of (min_lon, max_lon) pairs: usually one, two when
+    the box crosses the antimeridian, and empty when the circle reaches a
+    pole (every longitude is then in range).
+    """
+    d_lat = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+    min_lat = lat - d_lat
+    max_lat = lat + d_lat
+
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), []
+    # Longitude degrees shrink towards the poles, so widen by the worst case
+    # (the edge of the box furthest from the equator)
+
+    widest = max(abs(min_lat), abs(max_lat))
+    d_lon = math.degrees(
+        radius_miles / (EARTH_RADIUS_MILES * math.cos(math.radians(widest)))
+    )
+    if d_lon >= 180:
+        return min_lat, max_lat, []
+    min_lon = lon - d_lon
+    max_lon = lon + d_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def within_bounding_box(origin, radius_miles, prefix="location__"):
+    """
+    Build a Q filter keeping rows whose Location falls inside the bounding box
+    of the search radius. Served by Location's unique (latitude, longitude,
+    name) index, so only nearby candidates ever leave the database.
+    """
+    min_lat, max_lat, lon_ranges = bounding_box(
+        origin[0], origin[1], radius_miles * BOX_MARGIN
+    )
+    q = Q(**{f"{prefix}latitude__range": (min_lat, max_lat)})
+    if lon_ranges:
+        lon_q = Q()
+        for min_lon, max_lon in lon_ranges:
+            lon_q |= Q(**{f"{prefix}longitude__range": (min_lon, max_lon)})
+        q &= lon_q
+    return q
+
+
+class HaversineEngine:
+    """Great-circle distances for a whole candidate set in one NumPy batch."""
+
+    name = "haversine"
+
+    def distances(self, origin, coords):
+        """Return an array of miles from origin to each (lat, lon) in coords."""
+        points = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+        lat1, lon1 = np.radians(origin)
+        lat2 = points[:, 0]
+        lon2 = points[:, 1]
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeodesicEngine:
+    """Exact ellipsoidal (WGS-84) distances, one geopy solve per point."""
+
+    name = "geodesic"
+
+    def distances(self, origin, coords):
+        return np.fromiter(
+            (geodesic(origin, c).miles for c in coords),
+            dtype=float,
+            count=len(coords),
+        )
+
+
+DISTANCE_ENGINES = {
+    "haversine": HaversineEngine,
+    "geodesic": GeodesicEngine,
+}
+
+
+def get_distance_engine(name=None):
+    """
+    Return the configured distance engine. name (or settings.DISTANCE_ENGINE)
+    is either a key of DISTANCE_ENGINES or a dotted path to an engine class.
+    """
+    name = name or getattr(settings, "DISTANCE_ENGINE", "haversine")
+    engine_class = DISTANCE_ENGINES.get(name) or import_string(name)
+    return engine_class()
+
+
+class DistanceMemo:
+    """
+    Per-process LRU of (engine name, quantized origin, location_id, location
+    coordinates) -> miles.
+
+    Location rows are reused across listings, so a distance computed once for
+    a town serves every listing there and every later search starting from
+    (roughly) the same point. Keys include the coordinates, so a Location
+    that moves is never served its old distance by any process; the
+    post_save signal also evicts its entries here.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+        return found
+
+    def set_many(self, items):
+        with self._lock:
+            self._data.update(items)
+            for key in items:
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def forget_location(self, location_id):
+        with self._lock:
+            stale = [key for key in self._data if key[2] == location_id]
+            for key in stale:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+distance_memo = DistanceMemo(getattr(settings, "DISTANCE_MEMO_SIZE", 50000))
+
+
+def quantize_origin(origin):
+    """Round an origin to ORIGIN_PRECISION decimals (~100 m) for memo keys."""
+    return (
+        round(float(origin[0]), ORIGIN_PRECISION),
+        round(float(origin[1]), ORIGIN_PRECISION),
+    )
+
+
+def location_distances(origin, locations, engine):
+    """
+    Return {location_id: miles} from origin for locations, a dict of
+    location_id -> (lat, lon). Memoised pairs are reused; the rest are
+    computed in a single engine batch.
+
+    Distances are measured from the origin rounded to ORIGIN_PRECISION, so
+    they may be off by up to ORIGIN_SLACK_MILES.
+    """
+    origin = quantize_origin(origin)
+    keys = {
+        loc_id: (engine.name, origin, loc_id, *coords)
+        for loc_id, coords in locations.items()
+    }
+    found = distance_memo.get_many(keys.values())
+    missing = [loc_id for loc_id, key in keys.items() if key not in found]
+    if missing:
+        miles = engine.distances(origin, [locations[i] for i in missing])
+        fresh = {keys[i]: float(m) for i, m in zip(missing, miles)}
+        distance_memo.set_many(fresh)
+        found.update(fresh)
+    return {loc_id: found[key] for loc_id, key in keys.items()}
+
+
+def locations_within(origin, locations, radius_miles, engine=None, exact=None):
+    """
+    Return {location_id: miles} for the locations within radius_miles of
+    origin. Distances are computed once per distinct Location, never once per
+    listing.
+
+    Distances are accurate to ORIGIN_SLACK_MILES (see location_distances).
+    With exact ranking (settings.DISTANCE_EXACT_RANKING) the survivors of a
+    slightly padded first pass are re-measured with GeodesicEngine from the
+    unrounded origin, so the slow solver only runs on the handful of places
+    actually shown.
+    """
+    if not locations:
+        return {}
+    engine = engine or get_distance_engine()
+    if exact is None:
+        exact = getattr(settings, "DISTANCE_EXACT_RANKING", False)
+    exact = exact and not isinstance(engine, GeodesicEngine)
+
+    if exact:
+        limit = radius_miles * BOX_MARGIN + ORIGIN_SLACK_MILES
+    else:
+        limit = radius_miles
+    inside = {
+        loc_id: miles
+        for loc_id, miles in location_distances(
+            origin, locations, engine
+        ).items()
+        if miles <= limit
+    }
+    if exact and inside:
+        # Origins vary continuously, so exact distances are not memoised
+
+        ids = list(inside)
+        exact_miles = GeodesicEngine().distances(
+            origin, [locations[i] for i in ids]
+        )
+        inside = {
+            i: float(m)
+            for i, m in zip(ids, exact_miles)
+            if m <= radius_miles
+        }
+    return inside
@@ -0,0 +1,97 @@
+"""
+Background geocoding of listing locations.
+
+Listing forms never wait on a remote geocoder: unknown places are saved as
+pending and queued as GeocodeJob rows (see skills.views._apply_location).
+`manage.py process_geocode_jobs` claims due jobs in batches, looks each
+distinct place up once (remote requests are spaced by the backend's rate
+limit), attaches the Location and deletes the job. Failed lookups are
+retried with exponential backoff; after GEOCODE_JOB_MAX_ATTEMPTS the listing
+is marked "failed" (not "not found"), and saving it again re-queues it.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from . import job_queue
+from .geocoding import GeocoderUnavailable, geocode, normalize_query
+from .models import GeocodeJob, Listing, Location
+
+
+def claim_jobs(limit, lease_seconds=None):
+    """Return up to limit due jobs, leased away from other workers."""
+    if lease_seconds is None:
+        lease_seconds = getattr(settings, "GEOCODE_JOB_LEASE", 300)
+    return job_queue.claim(GeocodeJob.objects.all(), limit, lease_seconds)
+
+
+def _finish(job, location, status=Listing.LOCATION_NOT_FOUND):
+    """
+    Attach location to the job's listing, or record status when None,
+    unless the provider has typed a different place since it was queued.
+    """
+    with transaction.atomic():
+        listing = (
+            Listing.objects.select_for_update()
+            .filter(
+                id=job.listing_id,
+                location_status=Listing.LOCATION_PENDING,
+                location_query=job.query,
+            )
+            .first()
+        )
+        if listing is not None:
+            if location is None:
+                listing.location_status = status
+            else:
+                listing.set_location(location)
+            # Full save so search indexes, caches and card versions follow
+
+            listing.save()
+        GeocodeJob.objects.filter(id=job.id, query=job.query).delete()
+
+
+def _retry(job, error):
+    """Back off job after a failed lookup; returns False once given up."""
+    if job_queue.retry(
+        GeocodeJob.objects.filter(id=job.id, query=job.query),
+        job,
+        error,
+        getattr(settings, "GEOCODE_JOB_MAX_ATTEMPTS", 5),
+    ):
+        return True
+    _finish(job, None, Listing.LOCATION_FAILED)
+    return False
+
+
+def process_jobs(jobs):
+    """
+    Geocode a batch of claimed jobs. Listings typed with the same place
+    share one lookup. Returns a dict of resolved / not_found / retried /
+    failed counts.
+    """
+    counts = {"resolved": 0, "not_found": 0, "retried": 0, "failed": 0}
+    by_place = {}
+    for job in jobs:
+        by_place.setdefault(normalize_query(job.query), []).append(job)
+
+    for place_jobs in by_place.values():
+        query = place_jobs[0].query
+        try:
+            geo = geocode(query, strict=True)
+        except GeocoderUnavailable as exc:
+            for job in place_jobs:
+                retried = _retry(job, f"Geocoder unavailable for {exc}")
+                counts["retried" if retried else "failed"] += 1
+            continue
+
+        location = None
+        if geo is not None:
+            location, _ = Location.objects.get_or_create(
+                name=query,
+                defaults={"latitude": geo.latitude, "longitude": geo.longitude},
+            )
+        for job in place_jobs:
+            _finish(job, location)
+        counts["resolved" if location else "not_found"] += len(place_jobs)
+    return counts
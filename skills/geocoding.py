@@ -0,0 +1,439 @@
+"""
+Geocoding service used by search and the listing forms.
+
+Backends are configured with settings.GEOCODER_BACKENDS (dotted paths tried
+in order), so tests and offline environments can swap Nominatim for
+LocalBackend. A lookup goes through:
+
+1. an in-process LRU of normalized query -> result (misses included),
+2. local backends such as the mmap'd gazetteer (no network, sub-ms),
+3. existing Location rows with the same name,
+4. the GeocodeCache table, shared by every worker, with separate TTLs for
+   hits and misses,
+5. remote backends such as Nominatim.
+
+Listing forms only use steps 1-4 (remote=False); places needing a remote
+lookup are queued as GeocodeJob rows for the process_geocode_jobs worker.
+Async views await remote lookups with ageocode(), which bounds the wait.
+Request paths never wait for the remote rate limit (block=False): a
+throttled backend is skipped, and only the worker queues behind it.
+"""
+
+import asyncio
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, close_old_connections
+from django.db.models.functions import Lower
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from geopy.exc import GeocoderRateLimited, GeopyError
+from geopy.geocoders import Nominatim
+
+from . import metrics
+from .gazetteer import GazetteerIndex
+from .models import GeocodeCache, Location
+
+GeoResult = namedtuple("GeoResult", ["latitude", "longitude"])
+
+# Cached "no such place" marker, so misses are not looked up again
+
+MISS = object()
+
+UK_POSTCODE = re.compile(r"^([a-z]{1,2}\d[a-z\d]?)\s*(\d[a-z]{2})$")
+
+# Longest query worth looking up (and the GeocodeCache.query column size);
+# no real place name is longer
+
+MAX_QUERY_LENGTH = 120
+
+
+class GeocoderUnavailable(Exception):
+    """Raised by geocode(strict=True) when no backend could give an answer."""
+
+
+def normalize_query(query):
+    """
+    Reduce a typed location to its cache key: trimmed, single-spaced,
+    case-folded, with UK postcodes in canonical "sw1a 1aa" form. Queries
+    longer than MAX_QUERY_LENGTH reduce to "" and are never looked up.
+    """
+    key = " ".join((query or "").split()).casefold()
+    if len(key) > MAX_QUERY_LENGTH:
+        return ""
+    match = UK_POSTCODE.match(key)
+    if match:
+        key = f"{match.group(1)} {match.group(2)}"
+    return key
+
+
+class RateLimiter:
+    """Space calls at least min_interval seconds apart (thread-safe)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Take the next free slot, sleeping until it comes."""
+        with self._lock:
+            slot = max(time.monotonic(), self._next)
+            self._next = slot + self.min_interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def try_acquire(self):
+        """Take a slot if one is free now; False instead of waiting."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next:
+                return False
+            self._next = now + self.min_interval
+            return True
+
+
+class NominatimBackend:
+    """
+    Remote OpenStreetMap geocoder, one request per lookup. Requests from a
+    process are spaced by settings.GEOCODER_MIN_INTERVAL to honour the
+    service's usage policy (at most one request per second).
+    """
+
+    remote = True
+
+    def __init__(self):
+        self.geolocator = Nominatim(
+            user_agent=getattr(settings, "GEOCODER_USER_AGENT", "skillshop"),
+            timeout=getattr(settings, "GEOCODER_TIMEOUT", 5),
+        )
+        self.limiter = RateLimiter(
+            getattr(settings, "GEOCODER_MIN_INTERVAL", 1.0)
+        )
+
+    def geocode(self, query, block=True):
+        if block:
+            self.limiter.wait()
+        elif not self.limiter.try_acquire():
+            raise GeocoderRateLimited("Nominatim rate limit reached")
+        geo = self.geolocator.geocode(query)
+        if geo:
+            return GeoResult(geo.latitude, geo.longitude)
+        return None
+
+
+class LocalBackend:
+    """
+    Offline stand-in resolving from settings.GEOCODER_LOCAL_PLACES, a dict of
+    place name -> (latitude, longitude).
+    """
+
+    remote = False
+
+    def __init__(self, places=None):
+        if places is None:
+            places = getattr(settings, "GEOCODER_LOCAL_PLACES", {})
+        self.places = {
+            normalize_query(name): GeoResult(*coords)
+            for name, coords in places.items()
+        }
+
+    def geocode(self, query):
+        return self.places.get(normalize_query(query))
+
+
+class GazetteerBackend:
+    """
+    Offline lookup of UK postcodes and place names in the index built by
+    the build_gazetteer command (settings.GAZETTEER_INDEX_PATH). Answers
+    nothing when the index has not been built.
+    """
+
+    remote = False
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, "GAZETTEER_INDEX_PATH", None)
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get_index(self):
+        index = self._index
+        if index is not None and not index.is_stale():
+            return index
+        with self._lock:
+            if self._index is None or self._index.is_stale():
+                try:
+                    self._index = GazetteerIndex(self.path)
+                except (OSError, TypeError, ValueError):
+                    self._index = None
+            return self._index
+
+    def geocode(self, query):
+        index = self.get_index()
+        if index is None:
+            return None
+        coords = index.lookup(normalize_query(query))
+        return GeoResult(*coords) if coords else None
+
+
+class TTLCache:
+    """Small thread-safe LRU whose entries expire after a per-entry TTL."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_lru = TTLCache(getattr(settings, "GEOCODE_LRU_SIZE", 2048))
+_backends = None
+
+
+def get_backends():
+    global _backends
+    if _backends is None:
+        _backends = [
+            import_string(path)()
+            for path in getattr(
+                settings,
+                "GEOCODER_BACKENDS",
+                ["skills.geocoding.NominatimBackend"],
+            )
+        ]
+    return _backends
+
+
+def clear_cache():
+    """Forget in-process results and backend instances."""
+    global _backends
+    _backends = None
+    _lru.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith("GEOCODE") or setting == "GAZETTEER_INDEX_PATH":
+        clear_cache()
+
+
+def _ttl(found):
+    if found:
+        return getattr(settings, "GEOCODE_CACHE_TTL", 30 * 24 * 3600)
+    return getattr(settings, "GEOCODE_NEGATIVE_TTL", 24 * 3600)
+
+
+def _remember(key, result):
+    _lru.set(key, result or MISS, _ttl(result is not None))
+
+
+def _lookup_db(query, key):
+    """Return a GeoResult, MISS, or None when the database has no answer."""
+    # Matches the Lower("name") index on Location
+
+    loc = (
+        Location.objects.alias(name_lower=Lower("name"))
+        .filter(name_lower=query.lower())
+        .values_list("latitude", "longitude")
+        .first()
+    )
+    if loc:
+        return GeoResult(*loc)
+    entry = GeocodeCache.objects.filter(query=key).first()
+    if entry is None:
+        return None
+    found = entry.latitude is not None
+    if entry.updated_at + timedelta(seconds=_ttl(found)) < timezone.now():
+        return None
+    return GeoResult(entry.latitude, entry.longitude) if found else MISS
+
+
+def _lookup_backends(query, remote, block=True):
+    """
+    Ask each local (or remote) backend in turn. Returns (result, answered):
+    answered is False when a backend failed, so the miss must not be cached.
+    """
+    answered = True
+    for backend in get_backends():
+        if backend.remote != remote:
+            continue
+        start = time.perf_counter()
+        try:
+            if remote:
+                result = backend.geocode(query, block=block)
+            else:
+                result = backend.geocode(query)
+        except GeopyError:
+            answered = False
+            continue
+        finally:
+            if remote:
+                metrics.record_geocoder_call(time.perf_counter() - start)
+        if result:
+            return result, True
+    return None, answered
+
+
+def has_remote_backends():
+    return any(backend.remote for backend in get_backends())
+
+
+def geocode_local(query):
+    """
+    Steps 1-4 of a lookup: a GeoResult, MISS for a known miss, or None
+    when only a remote backend could answer.
+    """
+    query = " ".join((query or "").split())
+    key = normalize_query(query)
+    if not key:
+        return MISS
+
+    cached = _lru.get(key)
+    if cached is not None:
+        return cached
+
+    result, _ = _lookup_backends(query, remote=False)
+    if result:
+        _remember(key, result)
+        return result
+
+    stored = _lookup_db(query, key)
+    if stored is not None:
+        _remember(key, None if stored is MISS else stored)
+    return stored
+
+
+def geocode(query, remote=True, strict=False, block=True):
+    """
+    Resolve a typed town, city or postcode to a GeoResult, or None if it
+    cannot be found (or the geocoder is unavailable).
+
+    With remote=False only the in-process, local and database tiers are
+    tried, so the call never waits on the network; None then also means
+    "not known locally". With strict=True a failing remote backend raises
+    GeocoderUnavailable instead of returning None. With block=False a remote
+    backend at its rate limit is skipped (as failing) instead of waited for.
+    """
+    local = geocode_local(query)
+    if local is not None:
+        return None if local is MISS else local
+    if not remote:
+        return None
+
+    query = " ".join(query.split())
+    key = normalize_query(query)
+
+    result, answered = _lookup_backends(query, remote=True, block=block)
+    if not answered and result is None:
+        if strict:
+            raise GeocoderUnavailable(query)
+        return None
+    try:
+        GeocodeCache.objects.update_or_create(
+            query=key,
+            defaults={
+                "latitude": result.latitude if result else None,
+                "longitude": result.longitude if result else None,
+                "updated_at": timezone.now(),
+            },
+        )
+    except DatabaseError:
+        # Concurrent lookups can collide on the write (SQLite locks); the
+        # answer is still good, only the shared cache entry is lost
+
+        pass
+    _remember(key, result)
+    return result
+
+
+_remote_pool = None
+_remote_pool_lock = threading.Lock()
+
+# In-flight remote lookups per event loop: normalized query -> future
+
+_inflight = weakref.WeakKeyDictionary()
+
+
+def _get_remote_pool():
+    global _remote_pool
+    with _remote_pool_lock:
+        if _remote_pool is None:
+            _remote_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, "GEOCODER_REMOTE_WORKERS", 4),
+                thread_name_prefix="geocoder",
+            )
+    return _remote_pool
+
+
+def _geocode_in_pool(query):
+    # Pool threads serve no request, so tidy their connections like one
+
+    close_old_connections()
+    try:
+        return geocode(query, strict=True, block=False)
+    finally:
+        close_old_connections()
+
+
+async def ageocode(query, timeout=None):
+    """
+    geocode() for async views: returns a GeoResult or None, and raises
+    TimeoutError after timeout seconds (settings.GEOCODER_ASYNC_TIMEOUT) or
+    GeocoderUnavailable when the remote backends failed or were at their
+    rate limit.
+
+    Remote lookups run on a small dedicated thread pool, and concurrent
+    callers asking for the same place share one lookup. Timing out or being
+    cancelled only stops the caller's wait: the lookup finishes in the
+    background and caches its answer for the next search.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "GEOCODER_ASYNC_TIMEOUT", 3.0)
+    key = normalize_query(query)
+    if not key:
+        return None
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
+    future = inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(
+            sync_to_async(
+                _geocode_in_pool,
+                thread_sensitive=False,
+                executor=_get_remote_pool(),
+            )(query)
+        )
+        inflight[key] = future
+        future.add_done_callback(lambda _: inflight.pop(key, None))
+    return await asyncio.wait_for(asyncio.shield(future), timeout)
@@ -0,0 +1,168 @@
+"""
+Listing photos and profile images: upload staging, storage backends and
+thumbnails.
+
+Forms never push images to the storage backend inside the request. Each new
+upload is staged in the database as an ImageUpload row (web and worker dynos
+share no disk); `manage.py process_image_uploads` then stores it with the
+configured backend (settings.IMAGE_STORAGE_BACKEND), which also produces the
+fixed-size thumbnails named in settings.IMAGE_THUMBNAIL_SIZES. Until then
+the field keeps its previous image.
+
+Templates build image URLs through the backend (the image_url and thumbnail
+filters in skills_images), so switching to LocalImageBackend for offline
+development and tests needs no template changes.
+"""
+
+import os
+import uuid
+
+import cloudinary.exceptions
+import cloudinary.uploader
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ImageUpload
+
+DEFAULT_THUMBNAIL_SIZES = {
+    "card": (300, 300),
+    "carousel": (800, 500),
+}
+
+
+class InvalidImage(Exception):
+    """The staged file is not an image the backend can store; do not retry."""
+
+
+def thumbnail_sizes():
+    return getattr(settings, "IMAGE_THUMBNAIL_SIZES", DEFAULT_THUMBNAIL_SIZES)
+
+
+class CloudinaryImageBackend:
+    """
+    Uploads to Cloudinary. Thumbnails are Cloudinary transformations created
+    eagerly at upload time, so the first page view never waits for them.
+    """
+
+    def transformation(self, size):
+        width, height = thumbnail_sizes()[size]
+        return {
+            "width": width,
+            "height": height,
+            "crop": "fill",
+            "gravity": "auto",
+            "quality": "auto",
+        }
+
+    def store(self, fileobj):
+        """Store an image file; returns the value to save in the field."""
+        try:
+            return cloudinary.uploader.upload_resource(
+                fileobj,
+                type="upload",
+                resource_type="image",
+                eager=[self.transformation(size) for size in thumbnail_sizes()],
+            )
+        except cloudinary.exceptions.BadRequest as exc:
+            raise InvalidImage(str(exc))
+
+    def url(self, resource, size=None):
+        if size is None:
+            return resource.url
+        return resource.build_url(**self.transformation(size))
+
+
+class LocalImageBackend:
+    """
+    Keeps images and Pillow-made thumbnails on the local filesystem under
+    settings.IMAGE_LOCAL_ROOT, served from IMAGE_LOCAL_URL. Needs no network,
+    for development and tests.
+    """
+
+    prefix = "local"
+
+    def __init__(self, location=None, base_url=None):
+        self.storage = FileSystemStorage(
+            location=location or settings.IMAGE_LOCAL_ROOT,
+            base_url=base_url or settings.IMAGE_LOCAL_URL,
+        )
+
+    def store(self, fileobj):
+        try:
+            image = ImageOps.exif_transpose(Image.open(fileobj))
+            image = image.convert("RGB")
+        except (UnidentifiedImageError, OSError) as exc:
+            raise InvalidImage(str(exc))
+
+        key = uuid.uuid4().hex
+        self._save(image, f"{key}.jpg")
+        for size, dimensions in thumbnail_sizes().items():
+            self._save(ImageOps.fit(image, dimensions), f"{size}/{key}.jpg")
+        return f"{self.prefix}/{key}.jpg"
+
+    def _save(self, image, name):
+        path = self.storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image.save(path, "JPEG", quality=85)
+
+    def url(self, resource, size=None):
+        # Stored as "local/<key>.jpg": the field parses it into
+        # public_id "local/<key>" and format "jpg"
+
+        key = resource.public_id.rsplit("/", 1)[-1]
+        name = f"{key}.jpg" if size is None else f"{size}/{key}.jpg"
+        return self.storage.url(name)
+
+
+_backend = None
+
+
+def get_image_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(
+            getattr(
+                settings,
+                "IMAGE_STORAGE_BACKEND",
+                "skills.images.CloudinaryImageBackend",
+            )
+        )()
+    return _backend
+
+
+def stage_images(form):
+    """
+    Read the files just uploaded through a valid ModelForm, putting each
+    field's previous value back on form.instance so saving it uploads
+    nothing. Returns [(field, staged name, data)] for queue_images() once
+    the instance has been saved.
+    """
+    staged = []
+    for field, upload in form.cleaned_data.items():
+        if not isinstance(upload, UploadedFile):
+            continue
+        ext = os.path.splitext(upload.name)[1].lower()[:10]
+        data = b"".join(upload.chunks())
+        staged.append((field, f"{uuid.uuid4().hex}{ext}", data))
+        setattr(form.instance, field, form.initial.get(field))
+    return staged
+
+
+def queue_images(instance, staged):
+    """Queue staged files for instance, replacing pending uploads per field."""
+    if not staged:
+        return
+    content_type = ContentType.objects.get_for_model(instance)
+    for field, name, data in staged:
+        job, created = ImageUpload.objects.get_or_create(
+            content_type=content_type,
+            object_id=instance.pk,
+            field_name=field,
+            defaults={"staged_name": name, "staged_data": data},
+        )
+        if not created:
+            job.requeue(name, data)
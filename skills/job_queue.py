@@ -0,0 +1,53 @@
+"""
+Claiming and retrying rows of the database work queues (GeocodeJob,
+ImageUpload): models with run_after, attempts and last_error columns,
+worked through by management commands.
+
+A worker claims due rows by pushing their run_after past a lease, so other
+workers skip them and the rows of a worker that dies come back once the
+lease expires. A failed try is retried with exponential backoff until the
+queue's attempt limit, when the caller gives up on the row.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+
+def claim(queryset, limit, lease_seconds):
+    """Return up to limit due rows of queryset, leased for lease_seconds."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            queryset.select_for_update(skip_locked=True, of=("self",))
+            .filter(run_after__lte=now)
+            .order_by("run_after", "id")[:limit]
+        )
+        queryset.model.objects.filter(id__in=[row.id for row in rows]).update(
+            run_after=now + timedelta(seconds=lease_seconds)
+        )
+    return rows
+
+
+def backoff(attempts):
+    """Seconds to wait after a row's (attempts + 1)th failed try."""
+    return min(60 * 2**attempts, 3600)
+
+
+def retry(current, row, error, max_attempts):
+    """
+    Schedule another try of row after a failure, updating it through
+    current (a queryset matching the row only while it is still the one
+    tried). Returns False, leaving the row alone, once max_attempts tries
+    have failed.
+    """
+    attempts = row.attempts + 1
+    if attempts >= max_attempts:
+        return False
+    current.update(
+        attempts=attempts,
+        run_after=timezone.now() + timedelta(seconds=backoff(row.attempts)),
+        last_error=str(error)[:200],
+    )
+    return True
@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from skills.models import Conversation, Listing, Message, Profile, Skill
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare message write throughput of Message.save() against "
+        "Message.bulk_send(). Works on throwaway users and threads in a "
+        "transaction that is rolled back, so nothing is left behind (and "
+        "neither side pays for commits)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = options["messages"]
+        threads = options["threads"]
+        with transaction.atomic():
+            save_secs, bulk_secs = self.run(
+                total, threads, options["batch_size"]
+            )
+            transaction.set_rollback(True)
+
+        for label, secs in (("save()", save_secs), ("bulk_send()", bulk_secs)):
+            self.stdout.write(
+                f"{label:<12} {total} messages over {threads} threads: "
+                f"{secs:.3f}s ({total / secs:,.0f} msg/s)"
+            )
+        speed_up = save_secs / bulk_secs
+        self.stdout.write(
+            self.style.SUCCESS(f"bulk_send() speed-up: {speed_up:.1f}x")
+        )
+
+    def run(self, total, threads, batch_size):
+        users = [
+            User.objects.create(username=f"bench_messages_{i}")
+            for i in range(threads + 1)
+        ]
+        profiles = list(Profile.objects.filter(user__in=users))
+        provider, clients = profiles[0], profiles[1:]
+        skill = Skill.objects.create(name="bench_messages skill")
+        listing = Listing.objects.create(
+            provider=provider, skill=skill, description="bench", price=1
+        )
+        conversations = [
+            Conversation.get_or_start(listing, client, provider)[0]
+            for client in clients
+        ]
+
+        def batch():
+            return [
+                Message(
+                    conversation=conversations[i % threads],
+                    sender=provider if i % 2 else clients[i % threads],
+                    body=f"Benchmark message {i}",
+                )
+                for i in range(total)
+            ]
+
+        pending = batch()
+        start = time.perf_counter()
+        for msg in pending:
+            msg.save()
+        save_secs = time.perf_counter() - start
+
+        pending = batch()
+        start = time.perf_counter()
+        Message.bulk_send(pending, batch_size=batch_size)
+        bulk_secs = time.perf_counter() - start
+        return save_secs, bulk_secs
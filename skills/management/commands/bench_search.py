@@ -0,0 +1,248 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from skills import dataset, fragments, geocoding
+from skills.forms import ListingForm
+from skills.geo import distance_memo, locations_within, within_bounding_box
+from skills.models import Listing, Location
+
+# The catalogue is seeded over the "midlands" region, so a search from its
+# middle with the default 25-mile radius has about a fifth of the listings
+# as candidates (~200 at 1,000); over the whole UK every stage would work on
+# about a dozen at that size
+
+REGION = "midlands"
+ORIGIN = (52.5, -1.5)
+
+
+def _timed(fn, repeat, setup=None):
+    """Run fn repeat times; returns (last result, [milliseconds])."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, times
+
+
+def _stats(times):
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Time each stage of the search pipeline (geocoding, ORM fetch, "
+        "distance, sort, rendering) separately at growing catalogue sizes, "
+        "in a throwaway test database. Writes JSON for comparing commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000,100000",
+            help="Comma-separated listing counts",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--radius", type=float, default=25.0)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output", help="Write the JSON here instead of stdout"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(s) for s in options["sizes"].split(","))
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+        if options["repeat"] < 1 or not sizes or sizes[0] < 10:
+            raise CommandError("Need --repeat >= 1 and sizes of 10 or more")
+
+        report = {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "radius_miles": options["radius"],
+            "sizes": {},
+        }
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            # Geocoding resolves the town from stored locations, never
+            # the network
+
+            with override_settings(GEOCODER_BACKENDS=[]):
+                built = 0
+                for i, size in enumerate(sizes):
+                    self.grow(size - built, options["seed"] + i, f"bench{i}")
+                    built = size
+                    report["sizes"][str(size)] = self.measure(options)
+                    if options["verbosity"] > 1:
+                        self.stderr.write(f"Measured {size} listings")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            cache.clear()
+            distance_memo.clear()
+            geocoding.clear_cache()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def grow(self, listings, seed, prefix):
+        """Add listings (ten per location, no reviews or threads)."""
+        if listings <= 0:
+            return
+        dataset.generate(
+            seed=seed,
+            users=max(10, listings // 10),
+            provider_share=0.5,
+            locations=max(1, listings // 10),
+            region=REGION,
+            listings_per_location="10",
+            reviews_per_listing="0",
+            threads_per_listing="0",
+            prefix=prefix,
+        )
+
+    def measure(self, options):
+        """Time every stage on the current catalogue."""
+        repeat = options["repeat"]
+        radius = options["radius"]
+        stages = {}
+
+        # Geocoding: a stored town, with and without the in-process LRU
+
+        town = (
+            Location.objects.order_by("id")
+            .values_list("name", flat=True)
+            .first()
+        )
+        _, times = _timed(
+            lambda: geocoding.geocode(town), repeat, geocoding.clear_cache
+        )
+        stages["geocode"] = _stats(times)
+        _, times = _timed(lambda: geocoding.geocode(town), repeat)
+        stages["geocode_cached"] = _stats(times)
+
+        # ORM fetch: the bounding-box candidate query with its joins
+
+        listings = Listing.objects.select_related(
+            "skill", "provider", "provider__user", "location"
+        ).filter(is_active=True)
+        candidates, times = _timed(
+            lambda: list(
+                listings.filter(within_bounding_box(ORIGIN, radius))
+            ),
+            repeat,
+        )
+        stages["orm_fetch"] = _stats(times)
+
+        # Distance: once per distinct Location, cold and memoised
+
+        locations = {
+            listing.location_id: (
+                listing.location.latitude,
+                listing.location.longitude,
+            )
+            for listing in candidates
+        }
+        nearby, times = _timed(
+            lambda: locations_within(ORIGIN, locations, radius),
+            repeat,
+            distance_memo.clear,
+        )
+        stages["distance"] = _stats(times)
+        _, times = _timed(
+            lambda: locations_within(ORIGIN, locations, radius), repeat
+        )
+        stages["distance_memoized"] = _stats(times)
+
+        # Sort: fan distances out to listings and order them
+
+        def fan_out_and_sort():
+            results = [
+                (listing, nearby[listing.location_id])
+                for listing in candidates
+                if listing.location_id in nearby
+            ]
+            results.sort(key=lambda x: x[1])
+            return results
+
+        results, times = _timed(fan_out_and_sort, repeat)
+        stages["sort"] = _stats(times)
+
+        # Rendering of search.html, with cold and warm card fragments
+
+        request = RequestFactory().get("/search/")
+        request.user = AnonymousUser()
+        entries = [
+            (listing.id, listing.version, miles) for listing, miles in results
+        ]
+        by_id = {listing.id: listing for listing, _ in results}
+
+        def render_page():
+            cards = fragments.render_listing_cards(
+                entries, lambda ids: {i: by_id[i] for i in ids}
+            )
+            return render_to_string(
+                "skills/search.html",
+                {"cards": cards, "form": ListingForm(search_mode=True)},
+                request=request,
+            )
+
+        _, times = _timed(render_page, repeat, cache.clear)
+        stages["render"] = _stats(times)
+        _, times = _timed(render_page, repeat)
+        stages["render_cached_cards"] = _stats(times)
+
+        total = sum(
+            stages[name]["median_ms"]
+            for name in ("geocode", "orm_fetch", "distance", "sort", "render")
+        )
+        return {
+            "listings": Listing.objects.count(),
+            "candidates": len(candidates),
+            "results": len(results),
+            "stages": stages,
+            "dominant_stage": max(
+                ("geocode", "orm_fetch", "distance", "sort", "render"),
+                key=lambda name: stages[name]["median_ms"],
+            ),
+            "total_median_ms": round(total, 3),
+        }
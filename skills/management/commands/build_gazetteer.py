@@ -0,0 +1,68 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from skills.gazetteer import DEFAULT_KEY_SIZE, build_index
+from skills.geocoding import normalize_query
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the memory-mapped gazetteer index used for offline geocoding "
+        "from a CSV of place names or postcodes with coordinates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Gazetteer CSV with a header row")
+        parser.add_argument(
+            "--output",
+            default=settings.GAZETTEER_INDEX_PATH,
+            help="Index file to write (default: GAZETTEER_INDEX_PATH)",
+        )
+        parser.add_argument("--name-column", default="name")
+        parser.add_argument("--lat-column", default="latitude")
+        parser.add_argument("--lon-column", default="longitude")
+        parser.add_argument(
+            "--key-size",
+            type=int,
+            default=DEFAULT_KEY_SIZE,
+            help="Bytes reserved per key; longer names are skipped",
+        )
+
+    def handle(self, *args, **options):
+        name_col = options["name_column"]
+        lat_col = options["lat_column"]
+        lon_col = options["lon_column"]
+
+        def rows(reader):
+            for row in reader:
+                try:
+                    lat = float(row[lat_col])
+                    lon = float(row[lon_col])
+                except (TypeError, ValueError):
+                    continue  # e.g. terminated postcodes without coordinates
+                yield normalize_query(row[name_col]), lat, lon
+
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8") as fh:
+                reader = csv.DictReader(fh)
+                missing = {name_col, lat_col, lon_col} - set(
+                    reader.fieldnames or []
+                )
+                if missing:
+                    raise CommandError(
+                        f"CSV is missing column(s): {', '.join(sorted(missing))}"
+                    )
+                written, skipped = build_index(
+                    rows(reader), options["output"], options["key_size"]
+                )
+        except OSError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {written} places to {options['output']} "
+                f"({skipped} duplicate or oversized names skipped)."
+            )
+        )
@@ -0,0 +1,343 @@
+import io
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+)
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import resolve, reverse
+from django.utils.module_loading import import_string
+
+from skills.metrics import PERCENTILES, percentile
+from skills.models import Conversation, Listing, Location
+
+DEFAULT_MIX = "search=40,listing_detail=25,profile=15,conversation=10,send=10"
+RADII = [5, 10, 15, 25, 50, 100]
+
+# CSRF secret shared by every synthetic client: sent both as the cookie and
+# as the X-CSRFToken header, which Django accepts for unmasked secrets
+
+CSRF_SECRET = "l0adt3stl0adt3stl0adt3stl0adt3st"
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*" and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+def build_environ(method, path, query="", body=b"", cookies=None, host=None):
+    """A WSGI environ for one request, as a front-end server would pass it."""
+    host = host or _host()
+    environ = {
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": host,
+        "REMOTE_ADDR": "127.0.0.1",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if body:
+        environ["CONTENT_TYPE"] = "application/x-www-form-urlencoded"
+    if cookies:
+        environ["HTTP_COOKIE"] = "; ".join(
+            f"{name}={value}" for name, value in cookies.items()
+        )
+    return environ
+
+
+def call_app(application, environ):
+    """Run one request through the WSGI app; returns the status code."""
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line[:3]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, "close"):
+            response.close()
+    return status[0]
+
+
+def make_request(kind, plan, rng):
+    """
+    Build (environ, label) for one request of the given kind. label is the
+    URL name the request resolves to, with the method for writes.
+    """
+    if kind == "search":
+        params = {
+            "location": rng.choice(plan["towns"]),
+            "radius": rng.choice(RADII),
+        }
+        if plan["skills"] and rng.random() < 0.5:
+            params["skill"] = rng.choice(plan["skills"])
+        return build_environ("GET", reverse("search"), urlencode(params)), None
+    if kind == "listing_detail":
+        path = reverse("listing_detail", args=[rng.choice(plan["listings"])])
+        cookies = None
+        if rng.random() < 0.3:
+            cookies = {"sessionid": rng.choice(plan["threads"])[1]}
+        return build_environ("GET", path, cookies=cookies), None
+    conversation_id, session_key = rng.choice(plan["threads"])
+    cookies = {"sessionid": session_key, "csrftoken": CSRF_SECRET}
+    if kind == "profile":
+        return build_environ("GET", reverse("profile"), cookies=cookies), None
+    path = reverse("conversation_detail", args=[conversation_id])
+    if kind == "conversation":
+        return build_environ("GET", path, cookies=cookies), None
+    body = urlencode({"body": f"Load test message {rng.random():.6f}"})
+    environ = build_environ("POST", path, body=body.encode(), cookies=cookies)
+    environ["HTTP_X_CSRFTOKEN"] = CSRF_SECRET
+    return environ, "conversation_detail POST"
+
+
+def run_worker(plan, kinds, weights, count, seed, shared=None):
+    """
+    Send count requests (or, in threads, draw from the shared budget) and
+    return [(label, status, seconds)].
+    """
+    from config.wsgi import application
+
+    rng = random.Random(seed)
+    samples = []
+    try:
+        while True:
+            if shared is not None:
+                with shared["lock"]:
+                    if shared["left"] <= 0:
+                        break
+                    shared["left"] -= 1
+            elif len(samples) >= count:
+                break
+            kind = rng.choices(kinds, weights)[0]
+            environ, label = make_request(kind, plan, rng)
+            label = label or resolve(environ["PATH_INFO"]).url_name
+            start = time.perf_counter()
+            try:
+                status = call_app(application, environ)
+            except Exception:
+                status = 599
+            samples.append((label, status, time.perf_counter() - start))
+    finally:
+        connections.close_all()
+    return samples
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test config.wsgi.application in-process with a weighted mix of "
+        "searches, listing views, inbox loads and message sends by existing "
+        "(e.g. seed_data) users. Reports throughput and latency percentiles "
+        "per URL name. Message sends are real writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="Threads or processes"
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Use a process pool (like gunicorn workers), not threads",
+        )
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help="Weights of search, listing_detail, profile, conversation "
+            "and send requests",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=200,
+            help="Logged-in users (taken from conversation participants)",
+        )
+        parser.add_argument("--warmup", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        kinds, weights = self.parse_mix(options["mix"])
+        plan, session_keys = self.build_plan(options)
+        try:
+            if options["warmup"]:
+                run_worker(plan, kinds, weights, options["warmup"], -1)
+            start = time.perf_counter()
+            samples = self.run(plan, kinds, weights, options)
+            elapsed = time.perf_counter() - start
+        finally:
+            Session.objects.filter(session_key__in=session_keys).delete()
+        report = self.summarize(samples, elapsed, options)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def parse_mix(self, mix):
+        kinds, weights = [], []
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            if name not in (
+                "search",
+                "listing_detail",
+                "profile",
+                "conversation",
+                "send",
+            ):
+                raise CommandError(f"Unknown request kind {name!r} in --mix")
+            try:
+                weight = float(weight)
+            except ValueError:
+                raise CommandError(f"Bad weight in --mix: {part!r}")
+            if weight > 0:
+                kinds.append(name)
+                weights.append(weight)
+        if not kinds:
+            raise CommandError("--mix gives every request kind zero weight")
+        return kinds, weights
+
+    def build_plan(self, options):
+        """Pick towns, listings and logged-in users; returns (plan, sessions)."""
+        rng = random.Random(options["seed"])
+        towns = list(Location.objects.values_list("name", flat=True)[:2000])
+        active = Listing.objects.filter(is_active=True)
+        listings = list(active.values_list("id", flat=True)[:5000])
+        Through = Conversation.participants.through
+        pairs = list(
+            Through.objects.select_related("profile__user").order_by("id")[
+                : options["users"]
+            ]
+        )
+        if not towns or not listings or not pairs:
+            raise CommandError(
+                "Needs locations, listings and conversations; run seed_data."
+            )
+
+        # One session per user, created directly (no password needed)
+
+        SessionStore = import_string(settings.SESSION_ENGINE + ".SessionStore")
+        session_for = {}
+        threads = []
+        for pair in pairs:
+            user = pair.profile.user
+            if user.id not in session_for:
+                session = SessionStore()
+                session[SESSION_KEY] = str(user.pk)
+                session[BACKEND_SESSION_KEY] = (
+                    settings.AUTHENTICATION_BACKENDS[0]
+                )
+                session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+                session.create()
+                session_for[user.id] = session.session_key
+            threads.append((pair.conversation_id, session_for[user.id]))
+        rng.shuffle(threads)
+        plan = {
+            "towns": towns,
+            "listings": listings,
+            "skills": list(
+                active.values_list("skill_id", flat=True).distinct()[:200]
+            ),
+            "threads": threads,
+        }
+        return plan, list(session_for.values())
+
+    def run(self, plan, kinds, weights, options):
+        workers = options["concurrency"]
+        total = options["requests"]
+        seed = options["seed"]
+        if options["processes"]:
+            # Forked workers must not share the parent's DB connections
+
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            shares = [
+                total // workers + (i < total % workers) for i in range(workers)
+            ]
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                futures = [
+                    pool.submit(run_worker, plan, kinds, weights, n, seed + i)
+                    for i, n in enumerate(shares)
+                ]
+                return [s for f in futures for s in f.result()]
+        shared = {"left": total, "lock": threading.Lock()}
+        with ThreadPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(
+                    run_worker, plan, kinds, weights, 0, seed + i, shared
+                )
+                for i in range(workers)
+            ]
+            return [s for f in futures for s in f.result()]
+
+    def summarize(self, samples, elapsed, options):
+        by_name = {}
+        for label, status, seconds in samples:
+            by_name.setdefault(label, []).append((status, seconds))
+        views = {}
+        for label, rows in sorted(by_name.items()):
+            times = sorted(seconds * 1000 for _, seconds in rows)
+            entry = {
+                "requests": len(rows),
+                "errors": sum(1 for status, _ in rows if status >= 400),
+                "throughput": round(len(rows) / elapsed, 1),
+            }
+            for pct in PERCENTILES:
+                entry[f"p{pct}_ms"] = round(percentile(times, pct), 2)
+            views[label] = entry
+        return {
+            "mode": "processes" if options["processes"] else "threads",
+            "concurrency": options["concurrency"],
+            "requests": len(samples),
+            "errors": sum(v["errors"] for v in views.values()),
+            "seconds": round(elapsed, 3),
+            "throughput": round(len(samples) / elapsed, 1),
+            "views": views,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['seconds']}s with "
+            f"{report['concurrency']} {report['mode']}: "
+            f"{report['throughput']} req/s, {report['errors']} errors\n"
+        )
+        header = f"{'URL name':<26}{'reqs':>7}{'errs':>6}{'req/s':>9}"
+        header += "".join(f"{f'p{pct} ms':>10}" for pct in PERCENTILES)
+        self.stdout.write(header)
+        for label, entry in report["views"].items():
+            line = (
+                f"{label:<26}{entry['requests']:>7}{entry['errors']:>6}"
+                f"{entry['throughput']:>9}"
+            )
+            line += "".join(
+                f"{entry[f'p{pct}_ms']:>10}" for pct in PERCENTILES
+            )
+            self.stdout.write(line)
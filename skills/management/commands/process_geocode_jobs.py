@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from skills.geocode_queue import claim_jobs, process_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocode listings saved with a pending location. Runs until stopped "
+        "unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "GEOCODE_JOB_BATCH_SIZE", 50),
+            help="Jobs claimed per round",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no due jobs are left",
+        )
+        parser.add_argument(
+            "--idle-sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait before polling again when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        totals = {"resolved": 0, "not_found": 0, "retried": 0, "failed": 0}
+        try:
+            while True:
+                jobs = claim_jobs(options["batch_size"])
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["idle_sleep"])
+                    continue
+                counts = process_jobs(jobs)
+                for key, value in counts.items():
+                    totals[key] += value
+                if options["verbosity"] > 1:
+                    self.stdout.write(
+                        f"{len(jobs)} jobs: {counts['resolved']} resolved, "
+                        f"{counts['not_found']} not found, "
+                        f"{counts['retried']} retried, "
+                        f"{counts['failed']} failed"
+                    )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Geocoded {totals['resolved']} listings "
+                f"({totals['not_found']} not found, "
+                f"{totals['retried']} queued for retry, "
+                f"{totals['failed']} failed)."
+            )
+        )
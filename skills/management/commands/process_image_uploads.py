@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from skills.upload_queue import claim_uploads, process_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Store staged listing photos and profile images with the image "
+        "backend and build their thumbnails. Runs until stopped unless "
+        "--once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "IMAGE_UPLOAD_BATCH_SIZE", 20),
+            help="Uploads claimed per round",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no due uploads are left",
+        )
+        parser.add_argument(
+            "--idle-sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait before polling again when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        totals = {"stored": 0, "rejected": 0, "retried": 0}
+        try:
+            while True:
+                uploads = claim_uploads(options["batch_size"])
+                if not uploads:
+                    if options["once"]:
+                        break
+                    time.sleep(options["idle_sleep"])
+                    continue
+                counts = process_uploads(uploads)
+                for key, value in counts.items():
+                    totals[key] += value
+                if options["verbosity"] > 1:
+                    self.stdout.write(
+                        f"{len(uploads)} uploads: {counts['stored']} stored, "
+                        f"{counts['rejected']} rejected, "
+                        f"{counts['retried']} retried"
+                    )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {totals['stored']} images "
+                f"({totals['rejected']} rejected, "
+                f"{totals['retried']} queued for retry)."
+            )
+        )
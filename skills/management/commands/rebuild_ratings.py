@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from skills.models import Listing, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored rating_sum and review_count of every listing "
+        "from its reviews, repairing any drift."
+    )
+
+    def handle(self, *args, **options):
+        reviews = (
+            Review.objects.filter(listing=OuterRef("pk"))
+            .order_by()
+            .values("listing")
+        )
+        updated = Listing.objects.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("rating")).values("total")),
+                0,
+            ),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(n=Count("id")).values("n")), 0
+            ),
+            # Cached cards and headers show the stats
+            version=F("version") + 1,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt rating stats for {updated} listings.")
+        )
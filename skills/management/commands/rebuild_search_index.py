@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from skills import search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text keyword index over all listings."
+
+    def handle(self, *args, **options):
+        if not search_index.is_supported():
+            raise CommandError(
+                f"Full-text search is not supported on {connection.vendor}."
+            )
+        search_index.create_index()
+        search_index.rebuild()
+        self.stdout.write(self.style.SUCCESS("Rebuilt the listing search index."))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from skills.dataset import REGIONS, Distribution, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a deterministic synthetic dataset for "
+        "profiling. Distributions are specs such as 3, uniform:0:10, "
+        "poisson:4, geometric:4 or zipf:2[:max]."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--provider-share",
+            type=float,
+            default=0.3,
+            help="Fraction of users who are providers",
+        )
+        parser.add_argument("--skills", type=int, default=40)
+        parser.add_argument("--locations", type=int, default=200)
+        parser.add_argument("--region", choices=sorted(REGIONS), default="uk")
+        parser.add_argument("--listings-per-location", default="poisson:5")
+        parser.add_argument("--reviews-per-listing", default="geometric:3")
+        parser.add_argument("--threads-per-listing", default="poisson:1")
+        parser.add_argument("--messages-per-thread", default="poisson:8")
+        parser.add_argument(
+            "--prefix",
+            default="seed",
+            help="Username prefix; use a new one to add a second dataset",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        specs = {}
+        for name in (
+            "listings_per_location",
+            "reviews_per_listing",
+            "threads_per_listing",
+            "messages_per_thread",
+        ):
+            try:
+                specs[name] = Distribution(options[name])
+            except ValueError as exc:
+                raise CommandError(exc)
+
+        def log(message):
+            if options["verbosity"] > 1:
+                self.stdout.write(message)
+
+        start = time.perf_counter()
+        try:
+            counts = generate(
+                seed=options["seed"],
+                users=options["users"],
+                provider_share=options["provider_share"],
+                skills=options["skills"],
+                locations=options["locations"],
+                region=options["region"],
+                prefix=options["prefix"],
+                batch_size=options["batch_size"],
+                log=log,
+                **specs,
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        secs = time.perf_counter() - start
+        summary = ", ".join(f"{n} {model}" for model, n in counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {summary} in {secs:.1f}s.")
+        )
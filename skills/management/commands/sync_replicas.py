@@ -0,0 +1,38 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over every replica database "
+        "(local development stand-in for replication). Run it again to "
+        "bring the replicas up to date; until then they lag behind."
+    )
+
+    def handle(self, *args, **options):
+        aliases = getattr(settings, "REPLICA_DATABASES", [])
+        if not aliases:
+            raise CommandError("No replicas: set DATABASE_REPLICA_URLS.")
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in [DEFAULT_DB_ALIAS, *aliases]:
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(
+                    f"{alias!r} is not SQLite; real replicas are kept in "
+                    "sync by the database server."
+                )
+
+        source = sqlite3.connect(primary.settings_dict["NAME"])
+        try:
+            for alias in aliases:
+                connections[alias].close()
+                target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"Copied the primary to {alias}")
+        finally:
+            source.close()
@@ -0,0 +1,188 @@
+"""
+Lightweight per-request instrumentation.
+
+RequestMetricsMiddleware measures every resolved request: wall time, SQL
+query count and time, and remote geocoder calls and time. Samples are kept
+per URL name in a fixed-size in-memory window (per process), from which
+rolling p50/p95/p99 are computed on demand; recording a sample is O(1).
+
+SQL is timed by an execute wrapper installed on each database connection
+as it is opened; outside a measured request it only does one context
+variable lookup. Set REQUEST_METRICS_SERVER_TIMING to also send the figures
+in a Server-Timing response header.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PERCENTILES = (50, 95, 99)
+FIELDS = ("wall_ms", "sql_count", "sql_ms", "geocoder_calls", "geocoder_ms")
+
+
+class RequestMetrics:
+    """Counters for the request being handled."""
+
+    __slots__ = ("sql_count", "sql_time", "geocoder_calls", "geocoder_time")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.geocoder_calls = 0
+        self.geocoder_time = 0.0
+
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+def current():
+    """The RequestMetrics of the request being measured, or None."""
+    return _current.get()
+
+
+def record_geocoder_call(seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.geocoder_calls += 1
+        metrics.geocoder_time += seconds
+
+
+def sql_timer(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_count += 1
+        metrics.sql_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_sql_timer(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects, so only add it once
+
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not ordered:
+        return None
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class MetricsRegistry:
+    """Rolling window of request samples per URL name (thread-safe)."""
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, sample):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(sample)
+            self._totals[name] = self._totals.get(name, 0) + 1
+
+    def snapshot(self):
+        """
+        Return {url_name: {"count": total requests, "window": samples kept,
+        field: {"p50": .., "p95": .., "p99": .., "max": ..}}}.
+        """
+        with self._lock:
+            copied = {name: list(s) for name, s in self._samples.items()}
+            totals = dict(self._totals)
+        stats = {}
+        for name, samples in sorted(copied.items()):
+            entry = {"count": totals[name], "window": len(samples)}
+            for i, field in enumerate(FIELDS):
+                ordered = sorted(round(sample[i], 2) for sample in samples)
+                entry[field] = {
+                    f"p{pct}": percentile(ordered, pct) for pct in PERCENTILES
+                }
+                entry[field]["max"] = ordered[-1]
+            stats[name] = entry
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+registry = MetricsRegistry(getattr(settings, "REQUEST_METRICS_WINDOW", 1000))
+
+
+class RequestMetricsMiddleware:
+    """Records RequestMetrics for each request with a resolved URL name."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(
+            settings, "REQUEST_METRICS_SERVER_TIMING", False
+        )
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, metrics, wall):
+        # Streaming responses are measured up to the first byte
+
+        match = getattr(request, "resolver_match", None)
+        if match is None or not match.url_name:
+            return  # static files, 404s
+        sample = (
+            wall * 1000,
+            metrics.sql_count,
+            metrics.sql_time * 1000,
+            metrics.geocoder_calls,
+            metrics.geocoder_time * 1000,
+        )
+        registry.record(match.url_name, sample)
+        if self.server_timing:
+            response["Server-Timing"] = (
+                f"app;dur={sample[0]:.1f}, "
+                f'db;dur={sample[2]:.1f};desc="{sample[1]} queries", '
+                f'geo;dur={sample[4]:.1f};desc="{sample[3]} calls"'
+            )
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.28 on 2026-10-18 17:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_stats(apps, schema_editor):
+    Listing = apps.get_model("skills", "Listing")
+    Review = apps.get_model("skills", "Review")
+    reviews = (
+        Review.objects.filter(listing=OuterRef("pk"))
+        .order_by()
+        .values("listing")
+    )
+    Listing.objects.update(
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum("rating")).values("total")), 0
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(n=Count("id")).values("n")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0013_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
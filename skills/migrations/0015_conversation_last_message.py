@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-18 17:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def fill_last_message(apps, schema_editor):
+    Conversation = apps.get_model("skills", "Conversation")
+    Message = apps.get_model("skills", "Message")
+    newest = Message.objects.filter(conversation=OuterRef("pk")).order_by(
+        "-created_at", "-id"
+    )
+    Conversation.objects.update(last_message=Subquery(newest.values("id")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0014_listing_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='skills.message'),
+        ),
+        migrations.RunPython(fill_last_message, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.28 on 2026-10-18 17:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_unread_counters(apps, schema_editor):
+    Conversation = apps.get_model("skills", "Conversation")
+    Message = apps.get_model("skills", "Message")
+    UnreadCounter = apps.get_model("skills", "UnreadCounter")
+
+    # Unread messages per (conversation, sender); a participant's count is
+    # everything unread in the thread that they did not send themselves
+
+    by_sender = {}
+    totals = {}
+    unread = (
+        Message.objects.filter(is_read=False)
+        .order_by()
+        .values("conversation_id", "sender_id")
+        .annotate(n=Count("id"))
+    )
+    for row in unread:
+        key = (row["conversation_id"], row["sender_id"])
+        by_sender[key] = row["n"]
+        totals[row["conversation_id"]] = (
+            totals.get(row["conversation_id"], 0) + row["n"]
+        )
+
+    pairs = Conversation.participants.through.objects.values_list(
+        "conversation_id", "profile_id"
+    )
+    UnreadCounter.objects.bulk_create(
+        [
+            UnreadCounter(
+                conversation_id=conv_id,
+                profile_id=profile_id,
+                count=totals.get(conv_id, 0)
+                - by_sender.get((conv_id, profile_id), 0),
+            )
+            for conv_id, profile_id in pairs.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0015_conversation_last_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='skills.conversation')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='skills.profile')),
+            ],
+            options={
+                'unique_together': {('profile', 'conversation')},
+            },
+        ),
+        migrations.RunPython(fill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.2.28 on 2026-10-18 17:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def merge_into(apps, kept, duplicates):
+    """Move the messages and unread counts of duplicates into kept."""
+    Conversation = apps.get_model("skills", "Conversation")
+    Message = apps.get_model("skills", "Message")
+    UnreadCounter = apps.get_model("skills", "UnreadCounter")
+
+    Message.objects.filter(conversation__in=duplicates).update(
+        conversation=kept
+    )
+    for counter in UnreadCounter.objects.filter(
+        conversation__in=duplicates, count__gt=0
+    ):
+        target, _ = UnreadCounter.objects.get_or_create(
+            conversation=kept, profile_id=counter.profile_id
+        )
+        UnreadCounter.objects.filter(id=target.id).update(
+            count=models.F("count") + counter.count
+        )
+    newest = Message.objects.filter(conversation=kept).order_by(
+        "-created_at", "-id"
+    ).first()
+    updated_at = max(
+        Conversation.objects.filter(id__in=[kept, *duplicates]).values_list(
+            "updated_at", flat=True
+        )
+    )
+    Conversation.objects.filter(id=kept).update(
+        last_message=newest, updated_at=updated_at
+    )
+    # Through rows and unread counters cascade
+
+    Conversation.objects.filter(id__in=duplicates).delete()
+
+
+def fill_participant_pair(apps, schema_editor):
+    Conversation = apps.get_model("skills", "Conversation")
+    through = Conversation.participants.through
+
+    members = {}
+    for conv_id, profile_id in through.objects.values_list(
+        "conversation_id", "profile_id"
+    ).iterator():
+        members.setdefault(conv_id, []).append(profile_id)
+
+    # Threads about the same listing between the same two people are merged
+    # into the oldest, which keeps the key, so the unique constraint added
+    # by 0018 holds on existing data
+
+    threads = {}
+    for conv_id, listing_id in Conversation.objects.order_by(
+        "created_at", "id"
+    ).values_list("id", "listing_id"):
+        pair = sorted(members.get(conv_id, []))
+        if len(pair) != 2 or listing_id is None:
+            continue
+        threads.setdefault((listing_id, pair[0], pair[1]), []).append(conv_id)
+
+    for (listing_id, low, high), conv_ids in threads.items():
+        kept, duplicates = conv_ids[0], conv_ids[1:]
+        if duplicates:
+            merge_into(apps, kept, duplicates)
+        Conversation.objects.filter(id=kept).update(
+            participant_low_id=low, participant_high_id=high
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0016_unreadcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_high',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='skills.profile'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='participant_low',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='skills.profile'),
+        ),
+        migrations.RunPython(fill_participant_pair, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Separate from 0017's backfill: PostgreSQL cannot ALTER a table with
+    # pending trigger events from updates in the same transaction
+
+    dependencies = [
+        ('skills', '0017_conversation_participant_pair'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('listing', 'participant_low', 'participant_high'), name='unique_conversation_per_pair'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# A snapshot of skills.search_index as of this migration: later changes to
+# the module must not change what this migration does
+
+DOCUMENT_SELECT = """
+    SELECT l.id, l.description, s.name,
+           CASE WHEN p.first_name <> '' OR p.last_name <> ''
+                THEN TRIM(p.first_name || ' ' || p.last_name)
+                ELSE u.username END
+    FROM skills_listing l
+    JOIN skills_skill s ON s.id = l.skill_id
+    JOIN skills_profile p ON p.id = l.provider_id
+    JOIN auth_user u ON u.id = p.user_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS skills_listing_fts USING "
+            "fts5(description, skill, provider, "
+            "tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO skills_listing_fts "
+            f"(rowid, description, skill, provider) {DOCUMENT_SELECT}"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS skills_listing_fts ("
+            "listing_id bigint PRIMARY KEY REFERENCES skills_listing(id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS skills_listing_fts_document "
+            "ON skills_listing_fts USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO skills_listing_fts (listing_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', skill), 'A') || "
+            "setweight(to_tsvector('english', provider), 'B') || "
+            "setweight(to_tsvector('english', description), 'C') "
+            f"FROM ({DOCUMENT_SELECT}) "
+            "AS docs (id, description, skill, provider)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("sqlite", "postgresql"):
+        schema_editor.execute("DROP TABLE IF EXISTS skills_listing_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0018_conversation_unique_pair'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
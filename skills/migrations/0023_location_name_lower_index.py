@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 18:19
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0022_imageupload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='skills_location_name_lower'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0023_location_name_lower_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listing',
+            name='location_status',
+            field=models.CharField(choices=[('resolved', 'Resolved'), ('pending', 'Pending'), ('not_found', 'Not found'), ('failed', 'Lookup failed')], default='resolved', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0024_listing_location_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageupload',
+            name='staged_data',
+            field=models.BinaryField(default=b''),
+        ),
+    ]
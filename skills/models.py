@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Lower
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from cloudinary.models import CloudinaryField
+from .pubsub import conversation_channel, get_broker
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 # Create your models here.
@@ -38,12 +43,36 @@ class Location(models.Model):
     longitude = models.FloatField()
 
     class Meta:
+        # Its (latitude, longitude, ...) index also serves the bounding-box
+        # prefilter in radius search
+
         unique_together = ("latitude", "longitude", "name")
+        indexes = [
+            # Case-insensitive name lookups when geocoding (see
+            # geocoding._lookup_db)
+            models.Index(Lower("name"), name="skills_location_name_lower"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class GeocodeCache(models.Model):
+    """
+    Shared result of geocoding a normalized query. A null latitude records
+    a miss, so unknown places are not sent to the geocoder again until
+    GEOCODE_NEGATIVE_TTL has passed.
+    """
+
+    query = models.CharField(max_length=120, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.query
+
+
 class Listing(models.Model):
     provider = models.ForeignKey(
         Profile, on_delete=models.CASCADE, related_name="listings"
@@ -58,23 +87,215 @@ class Listing(models.Model):
     location = models.ForeignKey(
         Location, on_delete=models.PROTECT, null=True, blank=True
     )
+
+    # Typed locations that need a remote lookup are geocoded in the
+    # background (see GeocodeJob); until then the listing is saved without
+    # a Location and location_query keeps what the provider typed
+
+    LOCATION_RESOLVED = "resolved"
+    LOCATION_PENDING = "pending"
+    LOCATION_NOT_FOUND = "not_found"
+    LOCATION_FAILED = "failed"  # geocoder unavailable; saving retries it
+    LOCATION_STATUS_CHOICES = [
+        (LOCATION_RESOLVED, "Resolved"),
+        (LOCATION_PENDING, "Pending"),
+        (LOCATION_NOT_FOUND, "Not found"),
+        (LOCATION_FAILED, "Lookup failed"),
+    ]
+    location_status = models.CharField(
+        max_length=10,
+        choices=LOCATION_STATUS_CHOICES,
+        default=LOCATION_RESOLVED,
+    )
+    location_query = models.CharField(max_length=120, blank=True)
+
     # Up to 3 photos for each listing
 
     photo_1 = CloudinaryField("First image", blank=True, null=True)
     photo_2 = CloudinaryField("Second image", blank=True, null=True)
     photo_3 = CloudinaryField("Third image", blank=True, null=True)
 
+    # Rating stats kept in step with Review writes (see Review.save and the
+    # post_delete signal), so pages never aggregate the reviews table.
+    # `manage.py rebuild_ratings` recomputes them from scratch. Only ever
+    # changed by F() updates: save() leaves them alone once inserted.
+
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+
+    # Bumped whenever anything shown on the listing's card or header changes;
+    # part of the fragment cache keys (see skills.fragments)
+
+    version = models.PositiveIntegerField(default=1)
+
     class Meta:
         ordering = ["-created_at"]
 
     def __str__(self):
         return f"{self.skill.name} ({self.provider.user.username})"
 
+    STATS_FIELDS = ("rating_sum", "review_count")
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            # An instance loaded before a review arrived holds old stats;
+            # writing them back would undo that review's adjust_rating()
+
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.name not in self.STATS_FIELDS
+                ]
+            kwargs["update_fields"] = {*update_fields, "version"}
+
+            # Bumped in the database, so a concurrent adjust_rating() bump
+            # is not lost either
+
+            self.version = F("version") + 1
+            super().save(*args, **kwargs)
+            self.refresh_from_db(fields=["version"])
+        else:
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def adjust_rating(cls, listing_id, rating_delta, count_delta):
+        """
+        Apply a review's change to a listing's stored stats (and version) in
+        one UPDATE. Stats are clamped at zero so concurrent removals cannot
+        fail the CHECK constraint; `manage.py rebuild_ratings` repairs any
+        drift.
+        """
+        cls.objects.filter(id=listing_id).update(
+            rating_sum=Greatest(F("rating_sum") + rating_delta, 0),
+            review_count=Greatest(F("review_count") + count_delta, 0),
+            version=F("version") + 1,
+        )
+
+    @property
+    def avg_rating(self):
+        if not self.review_count:
+            return None
+        return self.rating_sum / self.review_count
+
+    @property
+    def avg_rating_int(self):
+        """Whole stars to fill in the star display."""
+        return int(self.avg_rating or 0)
+
     def get_photos(self):
         """Returns a list of populated photo fields."""
         photos = [self.photo_1, self.photo_2, self.photo_3]
         return [p for p in photos if p]
 
+    @property
+    def location_pending(self):
+        return self.location_status == self.LOCATION_PENDING
+
+    @property
+    def location_label(self):
+        """What to show for the listing's location, resolved or not."""
+        if self.location_id:
+            return self.location.name
+        if self.location_status == self.LOCATION_PENDING:
+            return f"{self.location_query} (locating\u2026)"
+        if self.location_status == self.LOCATION_NOT_FOUND:
+            return f"{self.location_query} (not found)"
+        if self.location_status == self.LOCATION_FAILED:
+            return f"{self.location_query} (lookup failed)"
+        return "Not set"
+
+    def set_location(self, location):
+        self.location = location
+        self.location_status = self.LOCATION_RESOLVED
+        self.location_query = ""
+
+    def queue_geocoding(self, query):
+        """
+        Clear the location and queue query for the background geocoder. Call
+        on an unsaved change; the job is written after the listing is saved.
+        """
+        self.location = None
+        self.location_status = self.LOCATION_PENDING
+        self.location_query = query
+
+
+class GeocodeJob(models.Model):
+    """
+    A listing waiting for its typed location to be geocoded remotely. One
+    job per listing; `manage.py process_geocode_jobs` works through them in
+    batches and deletes each job once its listing is resolved or given up.
+    """
+
+    listing = models.OneToOneField(
+        Listing, on_delete=models.CASCADE, related_name="geocode_job"
+    )
+    query = models.CharField(max_length=120)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # Not picked up before this time: set when queued, when claimed by a
+    # worker (a lease, so crashed workers' jobs come back) and on backoff
+
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.query} (listing {self.listing_id})"
+
+    @classmethod
+    def enqueue(cls, listing):
+        """(Re)queue listing.location_query, replacing any earlier job."""
+        cls.objects.update_or_create(
+            listing=listing,
+            defaults={
+                "query": listing.location_query,
+                "attempts": 0,
+                "run_after": timezone.now(),
+                "last_error": "",
+            },
+        )
+
+
+class ImageUpload(models.Model):
+    """
+    An image uploaded through a form, staged in staged_data (the database is
+    the one store web and worker processes share) until `manage.py
+    process_image_uploads` stores it with the image backend and sets it on
+    field_name of the target object (see skills.images). One pending upload
+    per object field; a newer upload replaces it, with a new staged_name.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey("content_type", "object_id")
+    field_name = models.CharField(max_length=50)
+    staged_name = models.CharField(max_length=255)
+    staged_data = models.BinaryField(default=b"")
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # Not picked up before this time (queued, leased to a worker, backoff)
+
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("content_type", "object_id", "field_name")
+
+    def __str__(self):
+        return f"{self.content_type.model} {self.object_id} {self.field_name}"
+
+    def requeue(self, staged_name, staged_data):
+        self.staged_name = staged_name
+        self.staged_data = staged_data
+        self.attempts = 0
+        self.run_after = timezone.now()
+        self.last_error = ""
+        self.save()
+
 
 class Review(models.Model):
     RATING_CHOICES = [(i, i) for i in range(1, 6)]  # 1, 2, 3, 4, 5
@@ -98,6 +319,37 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.rating}★ by {self.reviewer.user.username} on {self.listing_id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating and listing so an edit can apply just
+        # the difference
+
+        instance._loaded_rating = instance.__dict__.get("rating")
+        instance._loaded_listing_id = instance.__dict__.get("listing_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        previous = getattr(self, "_loaded_rating", None)
+        previous_listing = getattr(self, "_loaded_listing_id", None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding or previous is None:
+                if adding:
+                    Listing.adjust_rating(self.listing_id, self.rating, 1)
+            elif previous_listing != self.listing_id:
+                # Moved to another listing: take it off the old one
+
+                Listing.adjust_rating(previous_listing, -previous, -1)
+                Listing.adjust_rating(self.listing_id, self.rating, 1)
+            elif previous != self.rating:
+                Listing.adjust_rating(
+                    self.listing_id, self.rating - previous, 0
+                )
+        self._loaded_rating = self.rating
+        self._loaded_listing_id = self.listing_id
+
 
 class Conversation(models.Model):
     """
@@ -123,12 +375,78 @@ class Conversation(models.Model):
         auto_now=True
     )  # bump when new messages arrive
 
+    # Canonical (lower id, higher id) participant pair. Together with listing
+    # it identifies the thread, so lookup-or-create is one indexed query and
+    # concurrent clicks cannot open duplicate threads
+
+    participant_low = models.ForeignKey(
+        "Profile",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    participant_high = models.ForeignKey(
+        "Profile",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    # Newest message, kept by Message.save so the inbox can select_related it
+
+    last_message = models.ForeignKey(
+        "Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["listing", "participant_low", "participant_high"],
+                name="unique_conversation_per_pair",
+            )
+        ]
+
     def __str__(self):
         return f"Conversation {self.id}"
 
+    @classmethod
+    def get_or_start(cls, listing, profile, other):
+        """
+        Return (conversation, created) for the thread between two profiles
+        about a listing, creating it (with participants and unread counters)
+        when it does not exist yet.
+        """
+        low, high = sorted((profile, other), key=lambda p: p.id)
+        with transaction.atomic():
+            conv, created = cls.objects.get_or_create(
+                listing=listing, participant_low=low, participant_high=high
+            )
+            if created:
+                conv.participants.add(low, high)
+                UnreadCounter.objects.bulk_create(
+                    [
+                        UnreadCounter(profile=low, conversation=conv),
+                        UnreadCounter(profile=high, conversation=conv),
+                    ]
+                )
+        return conv, created
+
     def other_participant(self, profile):
-        """Return the other participant (useful in templates)."""
-        return self.participants.exclude(id=profile.id).first()
+        """
+        Return the other participant (useful in templates). Reads
+        participants.all() so a prefetch_related("participants") is reused
+        instead of running a query per conversation.
+        """
+        for participant in self.participants.all():
+            if participant.id != profile.id:
+                return participant
+        return None
 
 
 class Message(models.Model):
@@ -162,7 +480,114 @@ class Message(models.Model):
         return f"Msg {self.id} in Conv {self.conversation_id}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        Conversation.objects.filter(id=self.conversation_id).update(
-            updated_at=timezone.now()
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            changes = {"updated_at": timezone.now()}
+            if adding:
+                changes["last_message"] = self
+            Conversation.objects.filter(id=self.conversation_id).update(
+                **changes
+            )
+            if adding:
+                UnreadCounter.increment(self.conversation_id, self.sender_id)
+                notify_conversations([self.conversation_id])
+
+    @classmethod
+    def bulk_send(cls, messages, batch_size=500):
+        """
+        Insert many unsaved messages (imports, system notifications) at once.
+
+        Unlike save() there is no per-message Conversation UPDATE: after the
+        INSERTs, updated_at and last_message are bumped with a single UPDATE
+        covering every conversation in the batch, and unread counters once
+        per (conversation, sender). Returns the created messages.
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        with transaction.atomic():
+            created = cls.objects.bulk_create(messages, batch_size=batch_size)
+            unread = {}
+            for msg in created:
+                key = (msg.conversation_id, msg.sender_id)
+                unread[key] = unread.get(key, 0) + 1
+
+            newest = cls.objects.filter(
+                conversation=models.OuterRef("pk")
+            ).order_by("-created_at", "-id")
+            Conversation.objects.filter(
+                id__in={conv_id for conv_id, _ in unread}
+            ).update(
+                updated_at=timezone.now(),
+                last_message=models.Subquery(newest.values("id")[:1]),
+            )
+            for (conv_id, sender_id), count in unread.items():
+                UnreadCounter.increment(conv_id, sender_id, by=count)
+            notify_conversations({conv_id for conv_id, _ in unread})
+        return created
+
+
+def notify_conversations(conversation_ids):
+    """Wake live message streams once the current transaction commits."""
+    broker = get_broker()
+
+    def publish():
+        for conv_id in conversation_ids:
+            broker.publish(conversation_channel(conv_id))
+
+    transaction.on_commit(publish)
+
+
+class UnreadCounter(models.Model):
+    """
+    Number of unread messages one participant has in one conversation, so
+    unread badges never have to scan the Message table.
+    """
+
+    profile = models.ForeignKey(
+        "Profile", on_delete=models.CASCADE, related_name="unread_counters"
+    )
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, related_name="unread_counters"
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Leads with profile: serves both a user's total and per-thread rows
+
+        unique_together = ("profile", "conversation")
+
+    def __str__(self):
+        return f"{self.count} unread for {self.profile_id} in Conv {self.conversation_id}"
+
+    @classmethod
+    def increment(cls, conversation_id, sender_id, by=1):
+        """Add `by` unread messages for everyone in the thread but the sender."""
+        updated = (
+            cls.objects.filter(conversation_id=conversation_id)
+            .exclude(profile_id=sender_id)
+            .update(count=F("count") + by)
+        )
+        if updated:
+            return
+        # Threads created before counters existed: create the rows now
+
+        recipients = (
+            Conversation.participants.through.objects.filter(
+                conversation_id=conversation_id
+            )
+            .exclude(profile_id=sender_id)
+            .values_list("profile_id", flat=True)
+        )
+        cls.objects.bulk_create(
+            [
+                cls(
+                    profile_id=profile_id,
+                    conversation_id=conversation_id,
+                    count=by,
+                )
+                for profile_id in recipients
+            ],
+            ignore_conflicts=True,
         )
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Notification channel between message writers and live message streams.
+
+Only a "something changed on this channel" signal is published; streams read
+the new rows themselves, so a missed notification costs at most one poll
+interval. LocalBroker works within one process, which covers tests and a
+single ASGI worker; PostgresBroker carries notifications between processes
+(web workers, dynos) with PostgreSQL LISTEN/NOTIFY. settings.MESSAGE_BROKER
+picks one.
+"""
+
+import asyncio
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def conversation_channel(conversation_id):
+    return f"conversation:{conversation_id}"
+
+
+class Subscription:
+    """One waiting stream. Created and awaited on the stream's event loop."""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self):
+        # publish() may run on any thread (sync views under ASGI)
+
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+    async def wait(self, timeout):
+        """Return True if notified within timeout seconds, else False."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.event.clear()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub; publish() is thread-safe."""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        sub = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscriptions.get(sub.channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscriptions[sub.channel]
+
+    def publish(self, channel):
+        with self._lock:
+            subs = list(self._subscriptions.get(channel, ()))
+        for sub in subs:
+            sub.notify()
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Cross-process pub/sub over PostgreSQL NOTIFY. publish() sends a NOTIFY
+    on the calling thread's database connection; each process runs one
+    listener thread, with its own connection, that wakes the local
+    subscribers of the notified channel.
+    """
+
+    pg_channel = "skillshop_messages"
+    reconnect_delay = 5  # seconds
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, channel):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="message-broker", daemon=True
+                )
+                self._listener.start()
+        return super().subscribe(channel)
+
+    def publish(self, channel):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [self.pg_channel, channel]
+            )
+
+    def _wake_all(self):
+        with self._lock:
+            channels = list(self._subscriptions)
+        for channel in channels:
+            super().publish(channel)
+
+    def _listen(self):
+        import psycopg2
+
+        params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**params)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.pg_channel}")
+
+                # Notifications sent while disconnected are lost: make every
+                # stream re-poll
+
+                self._wake_all()
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        super().publish(conn.notifies.pop(0).payload)
+            except psycopg2.Error:
+                logger.exception("Message broker connection lost")
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(self.reconnect_delay)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(
+            getattr(settings, "MESSAGE_BROKER", "skills.pubsub.LocalBroker")
+        )()
+    return _broker
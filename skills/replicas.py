@@ -0,0 +1,185 @@
+"""
+Read-replica routing.
+
+settings.REPLICA_DATABASES names database aliases holding copies of the
+primary ("default"). Reads go to a replica only inside views decorated with
+@use_replica (search, home, anonymous listing_detail); everything else, and
+every write, uses the primary.
+
+Replicas lag behind the primary, so a browser that has just written is
+pinned to the primary for settings.REPLICA_MAX_LAG seconds with a short-lived
+cookie (read-your-writes). ReplicaPinMiddleware sets the pin whenever a
+request writes, which ReplicaRouter notices through db_for_write().
+"""
+
+import functools
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = "primary_pin"
+
+# Always read from the primary: sessions and sign-ins must see their own
+# rows straight away, and the database cache must not serve old versions
+
+PRIMARY_ONLY_APPS = {"sessions", "django_cache"}
+
+
+class RequestState:
+    __slots__ = ("pinned", "replica", "wrote")
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+
+
+_state = ContextVar("replica_state", default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, "REPLICA_DATABASES", []))
+
+
+def reading_replica():
+    """The replica alias this request reads from, or None."""
+    state = _state.get()
+    return state.replica if state is not None else None
+
+
+def is_pinned():
+    """Whether this request's browser wrote within the last max_lag()."""
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def max_lag():
+    return getattr(settings, "REPLICA_MAX_LAG", 10)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = reading_replica()
+        if replica is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+
+        dbs = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary, never from migrate
+
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def _pick_replica(request, anonymous_only):
+    """Sync helper: a replica alias for this request, or None."""
+    aliases = replica_aliases()
+    if not aliases or is_pinned():
+        return None
+    if anonymous_only and request.user.is_authenticated:
+        return None
+    return random.choice(aliases)
+
+
+def use_replica(view=None, *, anonymous_only=False):
+    """
+    Serve a read-only view's queries from a replica, unless the browser is
+    pinned to the primary (or, with anonymous_only, is logged in). Needs
+    ReplicaPinMiddleware.
+    """
+    if view is None:
+        return functools.partial(use_replica, anonymous_only=anonymous_only)
+
+    if iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            state = _state.get()
+            if state is not None:
+                if anonymous_only:
+                    state.replica = await sync_to_async(_pick_replica)(
+                        request, anonymous_only
+                    )
+                else:
+                    state.replica = _pick_replica(request, anonymous_only)
+            return await view(request, *args, **kwargs)
+
+    else:
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state = _state.get()
+            if state is not None:
+                state.replica = _pick_replica(request, anonymous_only)
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """
+    Tracks whether each request writes, and pins a browser that wrote to the
+    primary for REPLICA_MAX_LAG seconds. Place it before SessionMiddleware
+    so session saves count as writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState(PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = RequestState(PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def finish(self, state, response):
+        if state.wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=max_lag(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,51 @@
+"""
+Cache of search results keyed by the normalized query.
+
+Entries hold only the ordered (listing id, listing version, distance) rows,
+never rendered listings (cards are cached separately by skills.fragments),
+and every key embeds a catalogue version. Any change to a Listing,
+Review, Location, Skill or provider Profile stores a new version (see
+skills.signals), which retires every cached search at once. The version is
+shared between processes (see skills.versions), so a change made in one
+retires the searches cached by every other; the entries themselves stay per
+process.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import quantize_origin
+from .versions import VersionedNamespace
+
+namespace = VersionedNamespace("skills:search-version")
+
+
+def invalidate():
+    namespace.bump()
+
+
+def make_key(skill, keywords, origin, radius_miles, sort):
+    """Build the cache key for one normalized search."""
+    if origin is not None:
+        origin = quantize_origin(origin)
+        radius_miles = round(radius_miles, 2)
+    else:
+        radius_miles = None  # radius only matters with an origin
+    words = " ".join((keywords or "").casefold().split())
+    raw = repr((skill or "", words, origin, radius_miles, sort))
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"skills:results:{namespace.current()}:{digest}"
+
+
+def get(key):
+    """Return the cached [(listing_id, version, distance), ...] or None."""
+    return cache.get(key)
+
+
+def set(key, rows, timeout=None):
+    if timeout is None:
+        timeout = getattr(settings, "SEARCH_CACHE_TIMEOUT", 300)
+    if len(rows) <= getattr(settings, "SEARCH_CACHE_MAX_RESULTS", 2000):
+        cache.set(key, rows, timeout)
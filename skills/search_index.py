@@ -0,0 +1,185 @@
+"""
+Full-text index over listings for keyword search.
+
+Every listing has one document made of its description, its skill name and
+its provider's display name:
+
+* SQLite: an FTS5 virtual table (rowid = listing id), ranked with bm25().
+* PostgreSQL: a side table of tsvector documents with a GIN index, ranked
+  with ts_rank().
+
+Documents are rebuilt straight from the joined tables in SQL, so indexing one
+listing, every listing of a skill or provider, or the whole catalogue is a
+single statement. Signals in skills.signals keep the index in sync;
+`manage.py rebuild_search_index` rebuilds it from scratch.
+"""
+
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+
+TABLE = "skills_listing_fts"
+
+# Matches Profile.display_name(): "first last" when set, else the username
+
+_DOCUMENT_SELECT = """
+    SELECT l.id, l.description, s.name,
+           CASE WHEN p.first_name <> '' OR p.last_name <> ''
+                THEN TRIM(p.first_name || ' ' || p.last_name)
+                ELSE u.username END
+    FROM skills_listing l
+    JOIN skills_skill s ON s.id = l.skill_id
+    JOIN skills_profile p ON p.id = l.provider_id
+    JOIN auth_user u ON u.id = p.user_id
+"""
+
+
+def is_supported(conn=connection):
+    return conn.vendor in ("sqlite", "postgresql")
+
+
+def create_index(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "description, skill, provider, tokenize='porter unicode61')"
+            )
+        elif conn.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                "listing_id bigint PRIMARY KEY REFERENCES skills_listing(id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE}_document "
+                f"ON {TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(conn=connection):
+    if is_supported(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def _reindex(where, params, conn=connection):
+    """(Re)build the documents of the listings matched by a WHERE clause."""
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        if conn.vendor == "sqlite":
+            cursor.execute(
+                f"DELETE FROM {TABLE} WHERE rowid IN "
+                f"(SELECT l.id FROM skills_listing l WHERE {where})",
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, description, skill, provider) "
+                f"{_DOCUMENT_SELECT} WHERE {where}",
+                params,
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {TABLE} (listing_id, document) "
+                "SELECT id, "
+                "setweight(to_tsvector('english', skill), 'A') || "
+                "setweight(to_tsvector('english', provider), 'B') || "
+                "setweight(to_tsvector('english', description), 'C') "
+                f"FROM ({_DOCUMENT_SELECT} WHERE {where}) "
+                "AS docs (id, description, skill, provider) "
+                "ON CONFLICT (listing_id) "
+                "DO UPDATE SET document = EXCLUDED.document",
+                params,
+            )
+
+
+def index_listings(listing_ids, conn=connection):
+    listing_ids = list(listing_ids)
+    if listing_ids:
+        placeholders = ", ".join(["%s"] * len(listing_ids))
+        _reindex(f"l.id IN ({placeholders})", listing_ids, conn)
+
+
+def index_skill(skill_id, conn=connection):
+    _reindex("l.skill_id = %s", [skill_id], conn)
+
+
+def index_provider(profile_id, conn=connection):
+    _reindex("l.provider_id = %s", [profile_id], conn)
+
+
+def rebuild(conn=connection):
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    _reindex("1 = 1", [], conn)
+
+
+def remove_listings(listing_ids, conn=connection):
+    listing_ids = list(listing_ids)
+    if not listing_ids or not is_supported(conn):
+        return
+    placeholders = ", ".join(["%s"] * len(listing_ids))
+    key = "rowid" if conn.vendor == "sqlite" else "listing_id"
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE {key} IN ({placeholders})",
+            listing_ids,
+        )
+
+
+def match_listings(listings, query):
+    """
+    Narrow a Listing queryset to the listings matching any word of query,
+    best match first, or return None when the database has no full-text
+    support. Skill names weigh most, then provider names, then descriptions.
+
+    The match is a subquery of the listings query, so the queryset's other
+    filters (and any slice) apply to all matches rather than to a capped
+    list of ids. keyword_rank is annotated on each listing; lower is better.
+    """
+    conn = connections[listings.db]
+    if not is_supported(conn):
+        return None
+    # Words only: user input never reaches the match syntax
+
+    words = re.findall(r"\w+", query.casefold())
+    if not words:
+        return listings.none()
+    if conn.vendor == "sqlite":
+        terms = [" OR ".join(f'"{w}"' for w in words)]
+        ids = RawSQL(
+            f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", terms
+        )
+
+        # bm25() only works in the MATCH query itself; materialised, its
+        # scores are computed once rather than once per listing
+
+        rank = RawSQL(
+            f"WITH m AS MATERIALIZED (SELECT rowid AS id, "
+            f"bm25({TABLE}, 1.0, 4.0, 2.0) AS score FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s) "
+            "SELECT score FROM m WHERE m.id = skills_listing.id",
+            terms,
+        )
+    else:
+        terms = [" | ".join(words)]
+        ids = RawSQL(
+            f"SELECT listing_id FROM {TABLE} "
+            "WHERE document @@ to_tsquery('english', %s)",
+            terms,
+        )
+        rank = RawSQL(
+            "SELECT -ts_rank(document, to_tsquery('english', %s)) "
+            f"FROM {TABLE} WHERE listing_id = skills_listing.id",
+            terms,
+        )
+    return (
+        listings.filter(id__in=ids)
+        .annotate(keyword_rank=rank)
+        .order_by("keyword_rank", "id")
+    )
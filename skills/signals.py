@@ -1,10 +1,94 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from .models import Profile
+from . import catalog, search_cache, search_index
+from .geo import distance_memo
+from .models import Profile, Listing, Location, Review, Skill
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    # Runs inside the delete transaction, including cascades from Profile
+    # deletion, so the listing's rating stats never drift
+
+    rating = getattr(instance, "_loaded_rating", None) or instance.rating
+    listing_id = (
+        getattr(instance, "_loaded_listing_id", None) or instance.listing_id
+    )
+    Listing.adjust_rating(listing_id, -rating, -1)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_skill_catalog(sender, **kwargs):
+    # After commit, so no request can re-cache the old list under the new
+    # version
+
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=Listing)
+def index_listing(sender, instance, **kwargs):
+    search_index.index_listings([instance.id])
+
+
+@receiver(post_delete, sender=Listing)
+def unindex_listing(sender, instance, **kwargs):
+    search_index.remove_listings([instance.id])
+
+
+@receiver(post_save, sender=Skill)
+def reindex_skill_listings(sender, instance, created, **kwargs):
+    if not created:
+        search_index.index_skill(instance.id)
+        Listing.objects.filter(skill=instance).update(
+            version=F("version") + 1
+        )
+
+
+@receiver(post_save, sender=Profile)
+def reindex_provider_listings(sender, instance, created, **kwargs):
+    # Provider names and images are part of each listing's document and card
+
+    if not created:
+        search_index.index_provider(instance.id)
+        Listing.objects.filter(provider=instance).update(
+            version=F("version") + 1
+        )
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def forget_location_distances(sender, instance, created=False, **kwargs):
+    # New places have no memoised distances yet
+
+    if not created:
+        distance_memo.forget_location(instance.id)
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_search_cache(sender, **kwargs):
+    transaction.on_commit(search_cache.invalidate)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_search_cache_for_provider(sender, instance, created, **kwargs):
+    # A provider's name is searchable; new profiles have no listings yet
+
+    if not created:
+        transaction.on_commit(search_cache.invalidate)
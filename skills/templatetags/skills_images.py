@@ -0,0 +1,21 @@
+from django import template
+
+from skills.images import get_image_backend
+
+register = template.Library()
+
+
+@register.filter
+def image_url(image):
+    """Full-size URL of a stored image, or "" when there is none."""
+    if not image:
+        return ""
+    return get_image_backend().url(image)
+
+
+@register.filter
+def thumbnail(image, size):
+    """URL of the named fixed-size thumbnail (IMAGE_THUMBNAIL_SIZES)."""
+    if not image:
+        return ""
+    return get_image_backend().url(image, size)
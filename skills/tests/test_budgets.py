@@ -0,0 +1,366 @@
+"""
+Performance regression tests for the hot views, and the replica routing
+that spreads their reads.
+
+Every test runs against the same seeded dataset (skills.dataset) with the
+geocoder replaced by a local lookup, and asserts a budget: the most SQL
+queries the request may run and a wall-time ceiling. Query budgets are exact
+upper bounds, so a new N+1 (a query per inbox thread, per review, per
+message...) fails here rather than in production. Time ceilings are loose
+and can be scaled for slow CI machines with PERF_TIME_SCALE.
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from skills import dataset, geocoding, replicas
+from skills.forms import ListingForm
+from skills.models import Conversation, Listing, Message, Profile, Skill
+
+TIME_SCALE = float(os.environ.get("PERF_TIME_SCALE", "1"))
+
+# The seeded region is the UK; "Testville" sits in the middle of England
+
+TEST_PLACES = {"Testville": (52.5, -1.5)}
+
+
+@override_settings(
+    GEOCODER_BACKENDS=["skills.geocoding.LocalBackend"],
+    GEOCODER_LOCAL_PLACES=TEST_PLACES,
+    IMAGE_STORAGE_BACKEND="skills.images.LocalImageBackend",
+    REQUEST_METRICS_SERVER_TIMING=False,
+    REPLICA_DATABASES=[],  # budgets count queries on one connection
+)
+class BudgetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dataset.generate(
+            seed=1234,
+            users=300,
+            provider_share=0.3,
+            skills=20,
+            locations=60,
+            listings_per_location="poisson:4",
+            reviews_per_listing="uniform:2:8",
+            threads_per_listing="uniform:1:3",
+            messages_per_thread="uniform:2:30",
+            prefix="perf",
+        )
+
+        # Like real sign-ups, many profiles have no name, so display_name()
+        # falls back to the username and needs the User row loaded
+
+        Profile.objects.annotate(odd=F("id") % 2).filter(odd=1).update(
+            first_name="", last_name=""
+        )
+
+    def setUp(self):
+        # Budgets are for cold caches; warm paths are tested explicitly
+
+        cache.clear()
+        geocoding.clear_cache()
+
+    def assertBudget(self, url, max_queries, max_seconds):
+        """GET url and check its status, query count and wall time."""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = self.client.get(url)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200, url)
+        self.assertLessEqual(
+            len(queries),
+            max_queries,
+            f"{url} ran {len(queries)} queries (budget {max_queries}):\n"
+            + "\n".join(q["sql"] for q in queries.captured_queries),
+        )
+        self.assertLess(
+            elapsed,
+            max_seconds * TIME_SCALE,
+            f"{url} took {elapsed:.3f}s (ceiling {max_seconds}s)",
+        )
+        return response
+
+    def login(self, profile):
+        self.client.force_login(profile.user)
+
+
+class SearchBudgetTests(BudgetTestCase):
+    def test_search_without_location(self):
+        skill_id = Listing.objects.values_list("skill_id", flat=True)[0]
+        url = f"{reverse('search')}?skill={skill_id}"
+        self.assertBudget(url, max_queries=2, max_seconds=0.5)
+
+    def test_search_with_location(self):
+        url = f"{reverse('search')}?location=Testville&radius=100"
+        response = self.assertBudget(url, max_queries=2, max_seconds=0.5)
+        self.assertContains(response, "miles")
+
+    def test_repeated_search_is_served_from_cache(self):
+        url = f"{reverse('search')}?location=Testville&radius=100"
+        self.client.get(url)
+
+        # Only the check that the cached listings are still active
+
+        self.assertBudget(url, max_queries=1, max_seconds=0.1)
+
+    def test_cached_search_drops_deactivated_listings(self):
+        url = f"{reverse('search')}?location=Testville&radius=100"
+        page = self.client.get(url).content.decode()
+        listing_id, link = next(
+            (listing_id, link)
+            for listing_id in Listing.objects.values_list("id", flat=True)
+            for link in [reverse("listing_detail", args=[listing_id])]
+            if f'"{link}"' in page
+        )
+        # As if deactivated by another process: no signal, no new version
+
+        Listing.objects.filter(id=listing_id).update(is_active=False)
+        self.assertNotContains(self.client.get(url), f'"{link}"')
+
+    def test_overlong_location_is_not_looked_up(self):
+        url = f"{reverse('search')}?location={'x' * 500}"
+        response = self.assertBudget(url, max_queries=2, max_seconds=0.5)
+        self.assertContains(response, "Could not find that location")
+
+    def test_keyword_search(self):
+        url = f"{reverse('search')}?q=guitar+lessons"
+        self.assertBudget(url, max_queries=2, max_seconds=0.5)
+
+
+class ProfileBudgetTests(BudgetTestCase):
+    def busiest_profile(self):
+        return max(
+            Profile.objects.filter(user__username__startswith="perf_"),
+            key=lambda p: p.conversations.count(),
+        )
+
+    def test_profile_view(self):
+        self.login(self.busiest_profile())
+        self.assertBudget(reverse("profile"), max_queries=7, max_seconds=0.5)
+
+    def test_inbox_queries_do_not_grow_with_threads(self):
+        profile = self.busiest_profile()
+        self.login(profile)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse("profile"))
+
+        # Ten more threads, each with a message from the other side
+
+        others = Profile.objects.exclude(id=profile.id).filter(
+            listings__isnull=False
+        )[:10]
+        for other in others:
+            conv, _ = Conversation.get_or_start(
+                other.listings.first(), profile, other
+            )
+            Message.objects.create(conversation=conv, sender=other, body="Hi")
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(reverse("profile"))
+        self.assertEqual(len(after), len(before))
+
+
+class ListingDetailBudgetTests(BudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        # A listing with reviews whose client has had a reply from the
+        # provider, which makes the client eligible to review
+
+        cls.listing = (
+            Listing.objects.filter(
+                review_count__gte=5, conversations__messages__isnull=False
+            )
+            .order_by("id")
+            .first()
+        )
+        conversation = cls.listing.conversations.filter(
+            messages__sender=cls.listing.provider
+        ).first()
+        cls.reviewer = conversation.participants.exclude(
+            id=cls.listing.provider_id
+        ).get()
+        cls.url = reverse("listing_detail", args=[cls.listing.id])
+
+    def test_anonymous(self):
+        self.assertBudget(self.url, max_queries=2, max_seconds=0.3)
+
+    def test_eligible_reviewer(self):
+        self.login(self.reviewer)
+        response = self.assertBudget(self.url, max_queries=8, max_seconds=0.3)
+        self.assertTrue(response.context["can_review"])
+
+    def test_provider(self):
+        self.login(self.listing.provider)
+        response = self.assertBudget(self.url, max_queries=6, max_seconds=0.3)
+        self.assertTrue(response.context["is_owner"])
+
+    def test_review_queries_do_not_grow_with_reviews(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.url)
+        reviewers = Profile.objects.exclude(
+            id__in=self.listing.reviews.values("reviewer")
+        ).exclude(id=self.listing.provider_id)[:10]
+        for reviewer in reviewers:
+            self.listing.reviews.create(reviewer=reviewer, rating=4)
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(self.url)
+        self.assertEqual(len(after), len(before))
+
+
+class ConversationBudgetTests(BudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.conversation = (
+            Conversation.objects.filter(last_message__isnull=False)
+            .order_by("id")
+            .first()
+        )
+        cls.participant = cls.conversation.participants.first()
+        cls.url = reverse("conversation_detail", args=[cls.conversation.id])
+
+    def test_conversation_detail(self):
+        self.login(self.participant)
+        self.assertBudget(self.url, max_queries=8, max_seconds=0.3)
+
+    def test_queries_do_not_grow_with_messages(self):
+        self.login(self.participant)
+        other = self.conversation.participants.exclude(
+            id=self.participant.id
+        ).get()
+
+        def view_after_receiving(count):
+            # Unread messages each time, so both visits mark the thread read
+
+            Message.bulk_send(
+                [
+                    Message(
+                        conversation=self.conversation, sender=other, body="x"
+                    )
+                    for _ in range(count)
+                ]
+            )
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(self.url)
+            return len(queries)
+
+        self.assertEqual(view_after_receiving(20), view_after_receiving(1))
+
+    def test_unknown_cursor_shows_newest_page(self):
+        self.login(self.participant)
+        response = self.client.get(self.url, {"before": "999999999"})
+        self.assertFalse(response.context["is_history"])
+
+    def test_sending_does_not_load_the_thread(self):
+        self.login(self.participant)
+        page_limit = f"LIMIT {settings.MESSAGES_PAGE_SIZE + 1}"
+
+        def page_queries(queries):
+            return [q for q in queries if page_limit in q["sql"]]
+
+        with CaptureQueriesContext(connection) as viewing:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as sending:
+            response = self.client.post(self.url, {"body": "hello"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(page_queries(viewing))
+        self.assertFalse(page_queries(sending))
+
+
+class SkillCatalogTests(TestCase):
+    def test_form_accepts_skill_missing_from_cached_catalog(self):
+        ListingForm(search_mode=True)  # builds this process' catalog
+
+        # As if another process added it: no signal reaches this process
+
+        (skill,) = Skill.objects.bulk_create([Skill(name="Abseiling")])
+        form = ListingForm({"skill_choice": str(skill.id)}, search_mode=True)
+        form.is_valid()
+        self.assertNotIn("skill_choice", form.errors)
+
+
+@override_settings(REPLICA_DATABASES=["replica1"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Routing decisions only; no queries reach the (absent) replica."""
+
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+
+    def serve(self, view, cookies=None, user=None):
+        """Run view behind ReplicaPinMiddleware; returns its response."""
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies or {})
+        request.user = user or AnonymousUser()
+        return replicas.ReplicaPinMiddleware(view)(request)
+
+    def read_db_view(self, decorator=replicas.use_replica):
+        seen = {}
+
+        @decorator
+        def view(request):
+            seen["listing"] = self.router.db_for_read(Listing)
+            seen["session"] = self.router.db_for_read(Session)
+            return HttpResponse()
+
+        return view, seen
+
+    def test_undecorated_views_read_from_primary(self):
+        seen = {}
+
+        def view(request):
+            seen["db"] = self.router.db_for_read(Listing)
+            return HttpResponse()
+
+        self.serve(view)
+        self.assertIsNone(seen["db"])
+
+    def test_read_only_view_reads_from_replica(self):
+        view, seen = self.read_db_view()
+        self.serve(view)
+        self.assertEqual(seen["listing"], "replica1")
+        self.assertIsNone(seen["session"])
+
+    def test_anonymous_only_view_reads_from_primary_when_logged_in(self):
+        view, seen = self.read_db_view(
+            replicas.use_replica(anonymous_only=True)
+        )
+        self.serve(view, user=User(id=1))
+        self.assertIsNone(seen["listing"])
+        self.serve(view)
+        self.assertEqual(seen["listing"], "replica1")
+
+    def test_write_pins_browser_to_primary(self):
+        def view(request):
+            self.router.db_for_write(Listing)
+            return HttpResponse()
+
+        response = self.serve(view)
+        pin = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(pin["max-age"], replicas.max_lag())
+
+        view, seen = self.read_db_view()
+        self.serve(view, cookies={replicas.PIN_COOKIE: "1"})
+        self.assertIsNone(seen["listing"])
+
+    def test_reads_do_not_pin(self):
+        view, _ = self.read_db_view()
+        response = self.serve(view)
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
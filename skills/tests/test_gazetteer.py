@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from skills.gazetteer import GazetteerIndex, build_index
+from skills.geocoding import GazetteerBackend, GeoResult
+
+PLACES_CSV = """name,latitude,longitude
+Birmingham,52.4862,-1.8904
+SW1A 1AA,51.5010,-0.1416
+Terminated Postcode,,
+birmingham,0.0,0.0
+"""
+
+
+class GazetteerTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, "places.idx")
+
+    def build(self, csv_text=PLACES_CSV):
+        csv_path = os.path.join(self.tmp, "places.csv")
+        with open(csv_path, "w", encoding="utf-8") as fh:
+            fh.write(csv_text)
+        out = StringIO()
+        call_command("build_gazetteer", csv_path, output=self.path, stdout=out)
+        return out.getvalue()
+
+    def test_command_builds_a_normalized_index(self):
+        output = self.build()
+        self.assertIn("Wrote 2 places", output)
+        self.assertIn("1 duplicate or oversized names skipped", output)
+
+        index = GazetteerIndex(self.path)
+        self.addCleanup(index.close)
+        self.assertEqual(len(index), 2)
+
+        # The first row wins for a name given twice
+
+        self.assertEqual(index.lookup("birmingham"), (52.4862, -1.8904))
+        self.assertEqual(index.lookup("sw1a 1aa"), (51.5010, -0.1416))
+        self.assertIsNone(index.lookup("atlantis"))
+        self.assertIsNone(index.lookup("terminated postcode"))
+
+    def test_command_rejects_csv_without_the_columns(self):
+        with self.assertRaisesMessage(CommandError, "latitude, longitude"):
+            self.build("name,lat,lon\nBirmingham,52.5,-1.9\n")
+
+    def test_lookups_are_case_and_space_insensitive(self):
+        self.build()
+        backend = GazetteerBackend(self.path)
+        self.assertEqual(
+            backend.geocode("  BIRMINGHAM "), GeoResult(52.4862, -1.8904)
+        )
+        self.assertEqual(
+            backend.geocode("sw1a1aa"), GeoResult(51.5010, -0.1416)
+        )
+        self.assertIsNone(backend.geocode("Atlantis"))
+
+    def test_oversized_keys_are_skipped(self):
+        written, skipped = build_index(
+            [("a" * 9, 1.0, 2.0), ("short", 3.0, 4.0)], self.path, key_size=8
+        )
+        self.assertEqual((written, skipped), (1, 1))
+        index = GazetteerIndex(self.path)
+        self.addCleanup(index.close)
+        self.assertIsNone(index.lookup("a" * 9))
+        self.assertEqual(index.lookup("short"), (3.0, 4.0))
+
+    def test_rebuilt_index_is_stale_and_reloaded(self):
+        self.build()
+        backend = GazetteerBackend(self.path)
+        index = backend.get_index()
+        self.assertFalse(index.is_stale())
+
+        self.build("name,latitude,longitude\nCoventry,52.4068,-1.5197\n")
+        self.assertTrue(index.is_stale())
+        self.assertEqual(
+            backend.geocode("Coventry"), GeoResult(52.4068, -1.5197)
+        )
+        self.assertIsNone(backend.geocode("Birmingham"))
+
+    def test_missing_index_is_stale_and_answers_nothing(self):
+        self.build()
+        index = GazetteerIndex(self.path)
+        self.addCleanup(index.close)
+        os.remove(self.path)
+        self.assertTrue(index.is_stale())
+        self.assertIsNone(GazetteerBackend(self.path).geocode("Birmingham"))
@@ -0,0 +1,215 @@
+from django.test import SimpleTestCase, TestCase
+
+from skills.geo import (
+    DistanceMemo,
+    GeodesicEngine,
+    HaversineEngine,
+    bounding_box,
+    distance_memo,
+    get_distance_engine,
+    location_distances,
+    quantize_origin,
+    within_bounding_box,
+)
+from skills.models import Location
+
+LONDON = (51.5074, -0.1278)
+PARIS = (48.8566, 2.3522)
+
+
+class BoundingBoxTests(SimpleTestCase):
+    def test_box_encloses_the_circle(self):
+        min_lat, max_lat, lon_ranges = bounding_box(52.5, -1.5, 10)
+
+        # 10 miles is ~0.145 degrees of latitude, and ~0.24 degrees of
+        # longitude at this latitude
+
+        self.assertAlmostEqual(max_lat - 52.5, 0.1447, places=3)
+        self.assertAlmostEqual(52.5 - min_lat, 0.1447, places=3)
+        self.assertEqual(len(lon_ranges), 1)
+        min_lon, max_lon = lon_ranges[0]
+        self.assertLess(min_lon, -1.5 - 0.23)
+        self.assertGreater(max_lon, -1.5 + 0.23)
+
+    def test_circle_reaching_a_pole_spans_every_longitude(self):
+        min_lat, max_lat, lon_ranges = bounding_box(89.9, 10.0, 20)
+        self.assertEqual(max_lat, 90.0)
+        self.assertLess(min_lat, 89.9)
+        self.assertEqual(lon_ranges, [])
+
+        min_lat, max_lat, lon_ranges = bounding_box(-89.9, 10.0, 20)
+        self.assertEqual(min_lat, -90.0)
+        self.assertEqual(lon_ranges, [])
+
+    def test_box_crossing_the_antimeridian_is_split(self):
+        _, _, east = bounding_box(0.0, 179.9, 50)
+        self.assertEqual(len(east), 2)
+        (west_min, west_max), (wrap_min, wrap_max) = east
+        self.assertEqual((west_max, wrap_min), (180.0, -180.0))
+        self.assertLess(west_min, 179.9)
+        self.assertGreater(wrap_max, -180.0)
+
+        _, _, west = bounding_box(0.0, -179.9, 50)
+        self.assertEqual(len(west), 2)
+        self.assertEqual((west[0][1], west[1][0]), (180.0, -180.0))
+        self.assertLess(west[0][0], 180.0)
+        self.assertGreater(west[1][1], -179.9)
+
+
+class WithinBoundingBoxTests(TestCase):
+    def names_within(self, origin, radius_miles):
+        return set(
+            Location.objects.filter(
+                within_bounding_box(origin, radius_miles, prefix="")
+            ).values_list("name", flat=True)
+        )
+
+    def test_keeps_only_nearby_locations(self):
+        Location.objects.bulk_create(
+            [
+                Location(name="Centre", latitude=52.5, longitude=-1.5),
+                Location(name="Near", latitude=52.55, longitude=-1.45),
+                Location(name="Far north", latitude=53.5, longitude=-1.5),
+                Location(name="Far west", latitude=52.5, longitude=-3.0),
+            ]
+        )
+        self.assertEqual(
+            self.names_within((52.5, -1.5), 10), {"Centre", "Near"}
+        )
+
+    def test_matches_across_the_antimeridian(self):
+        Location.objects.bulk_create(
+            [
+                Location(name="East", latitude=0.0, longitude=179.95),
+                Location(name="West", latitude=0.0, longitude=-179.95),
+                Location(name="Far", latitude=0.0, longitude=178.0),
+            ]
+        )
+        self.assertEqual(
+            self.names_within((0.0, 179.95), 20), {"East", "West"}
+        )
+
+    def test_matches_every_longitude_near_a_pole(self):
+        Location.objects.bulk_create(
+            [
+                Location(name="Pole", latitude=89.95, longitude=0.0),
+                Location(name="Across", latitude=89.95, longitude=180.0),
+                Location(name="South", latitude=80.0, longitude=0.0),
+            ]
+        )
+        self.assertEqual(
+            self.names_within((89.95, 90.0), 20), {"Pole", "Across"}
+        )
+
+
+class DistanceEngineTests(SimpleTestCase):
+    def assertMiles(self, engine, origin, coords, expected, delta):
+        miles = engine.distances(origin, coords)
+        self.assertEqual(len(miles), len(expected))
+        for got, want in zip(miles, expected):
+            self.assertAlmostEqual(got, want, delta=delta)
+
+    def test_haversine_distances(self):
+        # On a sphere of radius 3958.8 miles a degree of arc is 69.09 miles
+        # along any great circle, and half way round is 12436.94
+
+        self.assertMiles(
+            HaversineEngine(),
+            (0.0, 0.0),
+            [(1.0, 0.0), (0.0, 1.0), (0.0, 0.0), (0.0, 180.0)],
+            [69.09, 69.09, 0.0, 12436.94],
+            delta=0.01,
+        )
+        self.assertMiles(HaversineEngine(), LONDON, [PARIS], [213.5], 0.1)
+
+    def test_geodesic_distances(self):
+        # WGS-84: a degree of latitude at the equator is 110.574 km, a
+        # degree of longitude there 111.320 km, and pole to pole along a
+        # meridian is 20003.93 km
+
+        self.assertMiles(
+            GeodesicEngine(),
+            (0.0, 0.0),
+            [(1.0, 0.0), (0.0, 1.0), (0.0, 0.0), (90.0, 0.0)],
+            [68.71, 69.17, 0.0, 6214.93],
+            delta=0.01,
+        )
+        self.assertMiles(GeodesicEngine(), LONDON, [PARIS], [213.7], 0.1)
+
+    def test_engines_agree_within_half_a_percent(self):
+        coords = [PARIS, (55.9533, -3.1883), (40.7128, -74.0060)]
+        haversine = HaversineEngine().distances(LONDON, coords)
+        geodesic = GeodesicEngine().distances(LONDON, coords)
+        for fast, exact in zip(haversine, geodesic):
+            self.assertLess(abs(fast - exact) / exact, 0.005)
+
+    def test_engine_is_picked_by_name_or_path(self):
+        self.assertIsInstance(
+            get_distance_engine("haversine"), HaversineEngine
+        )
+        self.assertIsInstance(
+            get_distance_engine("skills.geo.GeodesicEngine"), GeodesicEngine
+        )
+
+
+class CountingEngine(HaversineEngine):
+    def __init__(self):
+        self.measured = []
+
+    def distances(self, origin, coords):
+        self.measured.extend(coords)
+        return super().distances(origin, coords)
+
+
+class DistanceMemoTests(TestCase):
+    def setUp(self):
+        distance_memo.clear()
+        self.addCleanup(distance_memo.clear)
+        self.engine = CountingEngine()
+
+    def test_memoised_distances_are_reused(self):
+        places = {1: PARIS, 2: (55.9533, -3.1883)}
+        first = location_distances(LONDON, places, self.engine)
+        self.assertEqual(len(self.engine.measured), 2)
+
+        # A nearby origin rounds to the same point; only the new place is
+        # measured
+
+        places[3] = (53.4808, -2.2426)
+        again = location_distances((51.50741, -0.12782), places, self.engine)
+        self.assertEqual(self.engine.measured[2:], [(53.4808, -2.2426)])
+        self.assertEqual({k: again[k] for k in first}, first)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        memo = DistanceMemo(maxsize=2)
+        memo.set_many({"a": 1.0, "b": 2.0})
+        memo.get_many(["a"])
+        memo.set_many({"c": 3.0})
+        self.assertEqual(
+            memo.get_many(["a", "b", "c"]), {"a": 1.0, "c": 3.0}
+        )
+
+    def test_saving_a_location_forgets_its_distances(self):
+        moved, kept = Location.objects.bulk_create(
+            [
+                Location(name="Moved", latitude=49.0, longitude=2.0),
+                Location(name="Kept", latitude=PARIS[0], longitude=PARIS[1]),
+            ]
+        )
+        places = {
+            loc.id: (loc.latitude, loc.longitude) for loc in (moved, kept)
+        }
+        location_distances(LONDON, places, self.engine)
+
+        def memoised(loc_id, coords):
+            key = ("haversine", quantize_origin(LONDON), loc_id, *coords)
+            return distance_memo.get_many([key])
+
+        moved.latitude = 50.0
+        moved.save()
+
+        self.assertFalse(memoised(moved.id, (49.0, 2.0)))
+        self.assertTrue(memoised(kept.id, PARIS))
+        places[moved.id] = (50.0, 2.0)
+        location_distances(LONDON, places, self.engine)
+        self.assertEqual(self.engine.measured[2:], [(50.0, 2.0)])
@@ -0,0 +1,134 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from geopy.exc import GeocoderServiceError
+
+from skills import geocoding
+from skills.geocode_queue import claim_jobs, process_jobs
+from skills.geocoding import GeoResult
+from skills.models import GeocodeJob, Listing, Skill
+
+
+class FakeRemoteBackend:
+    """Stands in for Nominatim: answers from PLACES, or fails when DOWN."""
+
+    remote = True
+    PLACES = {"testville": GeoResult(52.5, -1.5)}
+    DOWN = False
+    calls = []
+
+    def geocode(self, query, block=True):
+        self.calls.append(query)
+        if self.DOWN:
+            raise GeocoderServiceError("service down")
+        return self.PLACES.get(query.casefold())
+
+
+@override_settings(
+    GEOCODER_BACKENDS=["skills.tests.test_geocode_queue.FakeRemoteBackend"],
+    GEOCODE_JOB_MAX_ATTEMPTS=3,
+)
+class GeocodeQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = User.objects.create_user("provider").profile
+        cls.skill = Skill.objects.create(name="Plumbing")
+
+    def setUp(self):
+        geocoding.clear_cache()
+        FakeRemoteBackend.DOWN = False
+        FakeRemoteBackend.calls = []
+        self.now = timezone.now()
+        clock = mock.patch("django.utils.timezone.now", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def queue(self, query):
+        listing = Listing(
+            provider=self.provider,
+            skill=self.skill,
+            description="Taps and pipes",
+            price=Decimal("20.00"),
+        )
+        listing.queue_geocoding(query)
+        listing.save()
+        GeocodeJob.enqueue(listing)
+        return listing
+
+    def test_claimed_jobs_come_back_when_the_lease_expires(self):
+        listing = self.queue("Testville")
+        self.assertEqual(
+            [job.listing_id for job in claim_jobs(10, lease_seconds=60)],
+            [listing.id],
+        )
+        self.assertEqual(claim_jobs(10), [])
+
+        # The worker died: nobody finished the job before its lease ran out
+
+        self.now += timedelta(seconds=61)
+        self.assertEqual(len(claim_jobs(10)), 1)
+
+    def test_each_place_is_looked_up_once(self):
+        first, second = self.queue("Testville"), self.queue(" testville ")
+        missing = self.queue("Atlantis")
+
+        counts = process_jobs(claim_jobs(10))
+
+        self.assertEqual(
+            counts, {"resolved": 2, "not_found": 1, "retried": 0, "failed": 0}
+        )
+        self.assertEqual(len(FakeRemoteBackend.calls), 2)
+        for listing in (first, second):
+            listing.refresh_from_db()
+            self.assertEqual(
+                listing.location_status, Listing.LOCATION_RESOLVED
+            )
+            self.assertEqual(listing.location.latitude, 52.5)
+        missing.refresh_from_db()
+        self.assertEqual(missing.location_status, Listing.LOCATION_NOT_FOUND)
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_unavailable_geocoder_backs_off_then_gives_up(self):
+        listing = self.queue("Testville")
+        FakeRemoteBackend.DOWN = True
+
+        for attempt, delay in ((1, 60), (2, 120)):
+            counts = process_jobs(claim_jobs(10))
+            self.assertEqual(counts["retried"], 1)
+            job = GeocodeJob.objects.get(listing=listing)
+            self.assertEqual(job.attempts, attempt)
+            self.assertEqual(
+                job.run_after, self.now + timedelta(seconds=delay)
+            )
+            self.assertIn("Geocoder unavailable", job.last_error)
+
+            # Not due again before its backoff has passed
+
+            self.assertEqual(claim_jobs(10), [])
+            self.now = job.run_after
+
+        counts = process_jobs(claim_jobs(10))
+        self.assertEqual(counts["failed"], 1)
+        listing.refresh_from_db()
+        self.assertEqual(listing.location_status, Listing.LOCATION_FAILED)
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_location_retyped_since_queued_is_left_alone(self):
+        listing = self.queue("Testville")
+        jobs = claim_jobs(10)
+
+        # The provider typed another place while the lookup was running
+
+        listing.queue_geocoding("Otherton")
+        listing.save()
+        GeocodeJob.enqueue(listing)
+        process_jobs(jobs)
+
+        listing.refresh_from_db()
+        self.assertEqual(listing.location_status, Listing.LOCATION_PENDING)
+        self.assertEqual(listing.location_query, "Otherton")
+        self.assertEqual(GeocodeJob.objects.get().query, "Otherton")
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from geopy.exc import GeocoderServiceError
+
+from skills import geocoding
+from skills.geocoding import MISS, GeocoderUnavailable, GeoResult
+from skills.models import GeocodeCache, Location
+
+
+class RecordingRemoteBackend:
+    """Remote stand-in: answers from PLACES, fails when DOWN."""
+
+    remote = True
+    PLACES = {"otherton": GeoResult(53.0, -2.0)}
+    DOWN = False
+    calls = []
+
+    def geocode(self, query, block=True):
+        self.calls.append(query)
+        if self.DOWN:
+            raise GeocoderServiceError("service down")
+        return self.PLACES.get(query.casefold())
+
+
+@override_settings(
+    GEOCODER_BACKENDS=[
+        "skills.geocoding.LocalBackend",
+        "skills.tests.test_geocoding.RecordingRemoteBackend",
+    ],
+    GEOCODER_LOCAL_PLACES={"Testville": (52.5, -1.5)},
+    GEOCODE_CACHE_TTL=3600,
+    GEOCODE_NEGATIVE_TTL=60,
+)
+class GeocodeTierTests(TestCase):
+    def setUp(self):
+        geocoding.clear_cache()
+        RecordingRemoteBackend.DOWN = False
+        RecordingRemoteBackend.calls = []
+        self.now = timezone.now()
+        clock = mock.patch("django.utils.timezone.now", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def new_process(self):
+        """Forget in-process results, as another worker would not have them."""
+        geocoding.clear_cache()
+
+    def test_local_backend_answers_without_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                geocoding.geocode(" testville "), GeoResult(52.5, -1.5)
+            )
+        self.assertEqual(RecordingRemoteBackend.calls, [])
+
+    def test_stored_location_answers_before_the_remote(self):
+        Location.objects.create(name="Brumley", latitude=52.4, longitude=-1.9)
+        self.assertEqual(geocoding.geocode("BRUMLEY"), GeoResult(52.4, -1.9))
+        self.assertEqual(RecordingRemoteBackend.calls, [])
+
+    def test_remote_answer_is_shared_through_the_table(self):
+        self.assertEqual(geocoding.geocode("Otherton"), GeoResult(53.0, -2.0))
+        entry = GeocodeCache.objects.get(query="otherton")
+        self.assertEqual((entry.latitude, entry.longitude), (53.0, -2.0))
+
+        # Answered in process, then by the table in a process that never
+        # asked
+
+        with self.assertNumQueries(0):
+            geocoding.geocode("otherton")
+        self.new_process()
+        self.assertEqual(geocoding.geocode("Otherton"), GeoResult(53.0, -2.0))
+        self.assertEqual(RecordingRemoteBackend.calls, ["Otherton"])
+
+    def test_hits_expire_after_their_ttl(self):
+        geocoding.geocode("Otherton")
+        self.new_process()
+        self.now += timedelta(seconds=3601)
+        self.assertIsNone(geocoding.geocode_local("Otherton"))
+        geocoding.geocode("Otherton")
+        self.assertEqual(len(RecordingRemoteBackend.calls), 2)
+
+    def test_misses_are_cached_for_the_negative_ttl(self):
+        self.assertIsNone(geocoding.geocode("Atlantis"))
+        entry = GeocodeCache.objects.get(query="atlantis")
+        self.assertIsNone(entry.latitude)
+
+        self.new_process()
+        self.assertIs(geocoding.geocode_local("Atlantis"), MISS)
+        self.assertIsNone(geocoding.geocode("Atlantis"))
+        self.assertEqual(RecordingRemoteBackend.calls, ["Atlantis"])
+
+        self.new_process()
+        self.now += timedelta(seconds=61)
+        self.assertIsNone(geocoding.geocode_local("Atlantis"))
+        geocoding.geocode("Atlantis")
+        self.assertEqual(len(RecordingRemoteBackend.calls), 2)
+
+    def test_failed_lookup_is_not_cached_as_a_miss(self):
+        RecordingRemoteBackend.DOWN = True
+        self.assertIsNone(geocoding.geocode("Otherton"))
+        with self.assertRaises(GeocoderUnavailable):
+            geocoding.geocode("Otherton", strict=True)
+        self.assertFalse(GeocodeCache.objects.exists())
+
+        RecordingRemoteBackend.DOWN = False
+        self.assertEqual(geocoding.geocode("Otherton"), GeoResult(53.0, -2.0))
+
+    def test_local_only_lookup_never_asks_the_remote(self):
+        self.assertIsNone(geocoding.geocode("Otherton", remote=False))
+        self.assertIsNone(geocoding.geocode_local("Otherton"))
+        self.assertEqual(RecordingRemoteBackend.calls, [])
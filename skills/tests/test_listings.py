@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from skills import geocoding, views
+from skills.models import GeocodeCache, GeocodeJob, Listing, Review, Skill
+
+
+class ListingSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        provider = User.objects.create_user("provider").profile
+        cls.reviewer = User.objects.create_user("reviewer").profile
+        cls.listing = Listing.objects.create(
+            provider=provider,
+            skill=Skill.objects.create(name="Plumbing"),
+            description="Taps and pipes",
+            price=Decimal("20.00"),
+        )
+
+    def test_review_posted_while_owner_is_editing_is_kept(self):
+        # The owner's edit works on the listing as it was when they loaded
+        # it; a review arrives before they save
+
+        editing = Listing.objects.get(id=self.listing.id)
+        Review.objects.create(
+            listing=self.listing, reviewer=self.reviewer, rating=4
+        )
+        editing.description = "Taps, pipes and boilers"
+        editing.save()
+
+        listing = Listing.objects.get(id=self.listing.id)
+        self.assertEqual(listing.description, "Taps, pipes and boilers")
+        self.assertEqual((listing.rating_sum, listing.review_count), (4, 1))
+
+    def test_explicit_update_fields_are_respected(self):
+        editing = Listing.objects.get(id=self.listing.id)
+        editing.description = "Not saved"
+        editing.price = Decimal("25.00")
+        editing.save(update_fields=["price"])
+
+        listing = Listing.objects.get(id=self.listing.id)
+        self.assertEqual(listing.price, Decimal("25.00"))
+        self.assertEqual(listing.description, "Taps and pipes")
+
+    def test_save_bumps_the_stored_version(self):
+        # A review bumps the version behind the stale instance's back; the
+        # save must count from the stored value, not the loaded one
+
+        editing = Listing.objects.get(id=self.listing.id)
+        Review.objects.create(
+            listing=self.listing, reviewer=self.reviewer, rating=5
+        )
+        editing.save()
+
+        self.assertEqual(editing.version, 3)
+        self.assertEqual(
+            Listing.objects.get(id=self.listing.id).version, 3
+        )
+
+        editing.save(update_fields=["price"])
+        self.assertEqual(editing.version, 4)
+
+
+@override_settings(
+    GEOCODER_BACKENDS=["skills.geocoding.LocalBackend"],
+    GEOCODER_LOCAL_PLACES={"Testville": (52.5, -1.5)},
+)
+class ListingLocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = User.objects.create_user("provider").profile
+        cls.provider.is_provider = True
+        cls.provider.save()
+        cls.skill = Skill.objects.create(name="Plumbing")
+
+        # Looked up before and not found
+
+        GeocodeCache.objects.create(
+            query="atlantis", updated_at=timezone.now()
+        )
+
+    def setUp(self):
+        geocoding.clear_cache()
+        self.client.force_login(self.provider.user)
+
+    def create(self, location_text):
+        return self.client.post(
+            reverse("create_listing"),
+            {
+                "skill_choice": str(self.skill.id),
+                "description": "Taps and pipes",
+                "price": "20.00",
+                "is_active": "on",
+                "location_text": location_text,
+            },
+        )
+
+    def test_known_place_is_attached_at_once(self):
+        self.create("Testville")
+        listing = Listing.objects.get()
+        self.assertEqual(listing.location_status, Listing.LOCATION_RESOLVED)
+        self.assertEqual(listing.location.name, "Testville")
+        self.assertFalse(GeocodeJob.objects.exists())
+
+    def test_known_miss_is_a_form_error(self):
+        response = self.create("Atlantis")
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context["form"],
+            "location_text",
+            [views.LOCATION_NOT_FOUND_ERROR],
+        )
+        self.assertFalse(Listing.objects.exists())
+
+    def test_unknown_place_is_queued(self):
+        self.create("Otherton")
+        listing = Listing.objects.get()
+        self.assertEqual(listing.location_status, Listing.LOCATION_PENDING)
+        self.assertEqual(
+            GeocodeJob.objects.get(listing=listing).query, "Otherton"
+        )
@@ -0,0 +1,178 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from skills.models import Conversation, Message, UnreadCounter
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create_user("me").profile
+        cls.other = User.objects.create_user("other").profile
+        cls.conv, _ = Conversation.get_or_start(None, cls.me, cls.other)
+
+    def counts(self):
+        return dict(
+            UnreadCounter.objects.filter(conversation=self.conv).values_list(
+                "profile_id", "count"
+            )
+        )
+
+    def test_sending_counts_for_everyone_but_the_sender(self):
+        Message.objects.create(
+            conversation=self.conv, sender=self.other, body="Hi"
+        )
+        UnreadCounter.increment(self.conv.id, self.other.id, by=2)
+        self.assertEqual(self.counts(), {self.me.id: 3, self.other.id: 0})
+
+    def test_thread_without_counters_gets_them_on_first_message(self):
+        UnreadCounter.objects.all().delete()
+        UnreadCounter.increment(self.conv.id, self.other.id, by=2)
+        self.assertEqual(self.counts(), {self.me.id: 2})
+
+    def test_opening_the_thread_marks_it_read(self):
+        mine = Message.objects.create(
+            conversation=self.conv, sender=self.me, body="Hello"
+        )
+        theirs = Message.objects.create(
+            conversation=self.conv, sender=self.other, body="Hi"
+        )
+        self.client.force_login(self.me.user)
+        url = reverse("conversation_detail", args=[self.conv.id])
+        self.client.get(url)
+
+        self.assertEqual(self.counts(), {self.me.id: 0, self.other.id: 1})
+        theirs.refresh_from_db()
+        mine.refresh_from_db()
+        self.assertTrue(theirs.is_read)
+        self.assertFalse(mine.is_read)  # the other side has not read it
+
+    def test_thread_with_nothing_unread_writes_nothing(self):
+        self.client.force_login(self.me.user)
+        url = reverse("conversation_detail", args=[self.conv.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)  # the counter, already zero
+        self.assertIn("skills_unreadcounter", updates[0])
+
+
+class BulkSendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create_user("me").profile
+        cls.ann = User.objects.create_user("ann").profile
+        cls.bob = User.objects.create_user("bob").profile
+        cls.with_ann, _ = Conversation.get_or_start(None, cls.me, cls.ann)
+        cls.with_bob, _ = Conversation.get_or_start(None, cls.me, cls.bob)
+
+    def test_sends_a_batch_with_one_update_per_table(self):
+        batch = [
+            Message(conversation=self.with_ann, sender=self.me, body="1"),
+            Message(conversation=self.with_bob, sender=self.me, body="2"),
+            Message(conversation=self.with_ann, sender=self.ann, body="3"),
+            Message(conversation=self.with_ann, sender=self.me, body="4"),
+        ]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                created = Message.bulk_send(batch, batch_size=2)
+
+        self.assertTrue(all(msg.pk for msg in created))
+        self.assertEqual(len(callbacks), 1)
+        conversation_updates = [
+            q
+            for q in queries
+            if q["sql"].startswith('UPDATE "skills_conversation"')
+        ]
+        self.assertEqual(len(conversation_updates), 1)
+
+        self.with_ann.refresh_from_db()
+        self.with_bob.refresh_from_db()
+        self.assertEqual(self.with_ann.last_message_id, batch[3].id)
+        self.assertEqual(self.with_bob.last_message_id, batch[1].id)
+
+        rows = UnreadCounter.objects.values_list(
+            "conversation_id", "profile_id", "count"
+        )
+        unread = {(conv, profile): count for conv, profile, count in rows}
+        self.assertEqual(
+            unread,
+            {
+                (self.with_ann.id, self.ann.id): 2,
+                (self.with_ann.id, self.me.id): 1,
+                (self.with_bob.id, self.bob.id): 1,
+                (self.with_bob.id, self.me.id): 0,
+            },
+        )
+
+    def test_empty_batch_does_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(Message.bulk_send([]), [])
+
+
+def stream_events(chunks):
+    """The message ids carried by a list of server-sent event chunks."""
+    return [
+        json.loads(chunk.split("data: ", 1)[1])["id"]
+        for chunk in chunks
+        if chunk.startswith("id: ")
+    ]
+
+
+@override_settings(
+    MESSAGE_BROKER="skills.pubsub.LocalBroker",
+    MESSAGE_STREAM_KEEPALIVE=0.2,
+    MESSAGE_STREAM_MAX_SECONDS=1,
+)
+class ConversationStreamTests(TransactionTestCase):
+    """A TransactionTestCase: the stream polls on pooled threads."""
+
+    def setUp(self):
+        self.me = User.objects.create_user("me").profile
+        self.other = User.objects.create_user("other").profile
+        self.conv, _ = Conversation.get_or_start(None, self.me, self.other)
+        self.first = Message.objects.create(
+            conversation=self.conv, sender=self.other, body="Hello"
+        )
+        self.async_client.force_login(self.me.user)
+        self.url = reverse("conversation_stream", args=[self.conv.id])
+
+    async def test_stream_emits_new_messages_and_ends(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        chunks = []
+        async for chunk in response.streaming_content:
+            chunks.append(chunk.decode())
+            if len(chunks) == 2:
+                # The backlog is out: a message sent now has to arrive
+                # live
+
+                reply = await sync_to_async(Message.objects.create)(
+                    conversation=self.conv, sender=self.other, body="Still?"
+                )
+
+        # The loop above only ends because the stream does, at
+        # MESSAGE_STREAM_MAX_SECONDS
+
+        self.assertTrue(chunks[0].startswith("retry: "))
+        self.assertEqual(stream_events(chunks), [self.first.id, reply.id])
+
+        counter = await UnreadCounter.objects.aget(
+            conversation=self.conv, profile=self.me
+        )
+        self.assertEqual(counter.count, 0)
+
+    async def test_stream_resumes_after_last_event_id(self):
+        response = await self.async_client.get(
+            self.url, headers={"Last-Event-ID": str(self.first.id)}
+        )
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertEqual(stream_events(chunks), [])
+        self.assertIn(": keep-alive\n\n", chunks)
@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from skills import metrics
+from skills.metrics import MetricsRegistry, percentile
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(percentile(ordered, 50), 50)
+        self.assertEqual(percentile(ordered, 95), 95)
+        self.assertEqual(percentile(ordered, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def test_window_keeps_the_newest_samples_but_counts_all(self):
+        registry = MetricsRegistry(window=3)
+        for wall in (900, 1, 2, 3):
+            registry.record("home", (wall, 1, 0.5, 0, 0))
+        registry.record("search", (10, 4, 2, 1, 300))
+
+        stats = registry.snapshot()
+        self.assertEqual(stats["home"]["count"], 4)
+        self.assertEqual(stats["home"]["window"], 3)
+        self.assertEqual(
+            stats["home"]["wall_ms"], {"p50": 2, "p95": 3, "p99": 3, "max": 3}
+        )
+        self.assertEqual(stats["search"]["geocoder_calls"]["max"], 1)
+        self.assertEqual(stats["search"]["geocoder_ms"]["p50"], 300)
+
+        registry.clear()
+        self.assertEqual(registry.snapshot(), {})
+
+    def test_geocoder_calls_count_only_inside_a_request(self):
+        metrics.record_geocoder_call(0.2)  # no request: ignored
+
+        token = metrics._current.set(metrics.RequestMetrics())
+        try:
+            metrics.record_geocoder_call(0.2)
+            metrics.record_geocoder_call(0.3)
+            counted = metrics.current()
+        finally:
+            metrics._current.reset(token)
+        self.assertEqual(counted.geocoder_calls, 2)
+        self.assertAlmostEqual(counted.geocoder_time, 0.5)
+        self.assertIsNone(metrics.current())
+
+
+class RequestMetricsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", is_staff=True)
+        cls.member = User.objects.create_user("member")
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.url = reverse("request_metrics")
+
+    def test_only_staff_can_read_metrics(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("admin:login"), response["Location"])
+
+        self.client.force_login(self.member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("admin:login"), response["Location"])
+
+    def test_staff_see_samples_recorded_by_the_middleware(self):
+        self.client.force_login(self.staff)
+        self.client.get(self.url)
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data["window"], metrics.registry.window)
+        stats = data["views"]["request_metrics"]
+        self.assertEqual(stats["count"], 1)  # the first request, not this one
+        self.assertGreaterEqual(stats["sql_count"]["max"], 1)  # session, user
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", '
+            r'geo;dur=[\d.]+;desc="0 calls"$',
+        )
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from skills.images import InvalidImage, queue_images
+from skills.models import ImageUpload, Listing, Skill
+from skills.upload_queue import claim_uploads, process_uploads
+
+
+class FakeImageBackend:
+    """Stores nothing: rejects b"not an image", and fails when down."""
+
+    def __init__(self):
+        self.down = False
+        self.stored = []
+
+    def store(self, fileobj):
+        data = fileobj.read()
+        if self.down:
+            raise ConnectionError("image service down")
+        if data == b"not an image":
+            raise InvalidImage("cannot identify image file")
+        self.stored.append(data)
+        return f"local/stored{len(self.stored)}.jpg"
+
+
+@override_settings(IMAGE_UPLOAD_MAX_ATTEMPTS=3)
+class UploadQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.listing = Listing.objects.create(
+            provider=User.objects.create_user("provider").profile,
+            skill=Skill.objects.create(name="Plumbing"),
+            description="Taps and pipes",
+            price=Decimal("20.00"),
+        )
+
+    def setUp(self):
+        self.backend = FakeImageBackend()
+        patcher = mock.patch(
+            "skills.upload_queue.get_image_backend", lambda: self.backend
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Ahead of the real clock, which run_after's default still reads
+
+        self.now = timezone.now() + timedelta(seconds=1)
+        clock = mock.patch("django.utils.timezone.now", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def stage(self, data, name="a.jpg", field="photo_1"):
+        queue_images(self.listing, [(field, name, data)])
+
+    def test_claim_leases_uploads_without_their_data(self):
+        self.stage(b"jpeg bytes")
+        (upload,) = claim_uploads(10, lease_seconds=60)
+        self.assertIn("staged_data", upload.get_deferred_fields())
+        self.assertEqual(claim_uploads(10), [])
+
+        self.now += timedelta(seconds=61)
+        self.assertEqual(len(claim_uploads(10)), 1)
+
+    def test_stored_image_is_set_on_its_object(self):
+        self.stage(b"jpeg bytes")
+        counts = process_uploads(claim_uploads(10))
+
+        self.assertEqual(counts, {"stored": 1, "rejected": 0, "retried": 0})
+        self.assertEqual(self.backend.stored, [b"jpeg bytes"])
+        listing = Listing.objects.get(id=self.listing.id)
+        self.assertEqual(listing.photo_1.public_id, "local/stored1")
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_file_that_is_not_an_image_is_dropped(self):
+        self.stage(b"not an image")
+        counts = process_uploads(claim_uploads(10))
+
+        self.assertEqual(counts["rejected"], 1)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(Listing.objects.get(id=self.listing.id).photo_1)
+
+    def test_failing_backend_backs_off_then_gives_up(self):
+        self.stage(b"jpeg bytes")
+        self.backend.down = True
+
+        for attempt, delay in ((1, 60), (2, 120)):
+            counts = process_uploads(claim_uploads(10))
+            self.assertEqual(counts["retried"], 1)
+            upload = ImageUpload.objects.get()
+            self.assertEqual(upload.attempts, attempt)
+            self.assertEqual(
+                upload.run_after, self.now + timedelta(seconds=delay)
+            )
+            self.assertEqual(upload.last_error, "image service down")
+            self.assertEqual(claim_uploads(10), [])
+            self.now = upload.run_after
+
+        process_uploads(claim_uploads(10))
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_missing_staged_data_is_retried(self):
+        self.stage(b"")
+        counts = process_uploads(claim_uploads(10))
+
+        self.assertEqual(counts["retried"], 1)
+        self.assertEqual(ImageUpload.objects.get().attempts, 1)
+
+    def test_upload_replaced_while_claimed_is_left_to_its_replacement(self):
+        self.stage(b"old bytes", name="old.jpg")
+        claimed = claim_uploads(10)
+        self.stage(b"new bytes", name="new.jpg")
+
+        counts = process_uploads(claimed)
+
+        self.assertEqual(counts, {"stored": 0, "rejected": 0, "retried": 0})
+        self.assertEqual(self.backend.stored, [])
+        self.assertEqual(ImageUpload.objects.get().staged_name, "new.jpg")
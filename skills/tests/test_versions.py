@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from skills.versions import VersionedNamespace
+
+
+@override_settings(SHARED_VERSION_TTL=5)
+class VersionedNamespaceTests(SimpleTestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.namespace = VersionedNamespace("test:version")
+        self.clock = mock.patch("skills.versions.time.monotonic")
+        self.now = self.clock.start()
+        self.now.return_value = 100.0
+        self.addCleanup(self.clock.stop)
+
+    def test_version_is_read_from_shared_cache_once_per_ttl(self):
+        version = self.namespace.current()
+        with mock.patch.object(caches["shared"], "get") as shared_get:
+            self.now.return_value = 104.0
+            self.assertEqual(self.namespace.current(), version)
+            shared_get.assert_not_called()
+
+    def test_bump_is_seen_at_once_by_its_own_process(self):
+        old = self.namespace.current()
+        new = self.namespace.bump()
+        self.assertNotEqual(new, old)
+        self.assertEqual(self.namespace.current(), new)
+
+    def test_other_process_bump_is_seen_after_ttl(self):
+        other_process = VersionedNamespace("test:version")
+        old = self.namespace.current()
+        new = other_process.bump()
+
+        self.now.return_value = 104.0
+        self.assertEqual(self.namespace.current(), old)
+        self.now.return_value = 106.0
+        self.assertEqual(self.namespace.current(), new)
@@ -0,0 +1,102 @@
+"""
+Background storage of staged image uploads.
+
+`manage.py process_image_uploads` claims due ImageUpload rows in batches,
+stores each staged image with the image backend (which also makes the
+thumbnails), sets the result on the target object and deletes the row.
+Backend failures, and uploads whose staged data is missing, are retried with
+exponential backoff; files the backend rejects as images are dropped.
+"""
+
+from io import BytesIO
+
+from django.conf import settings
+from django.db import transaction
+
+from . import job_queue
+from .images import InvalidImage, get_image_backend
+from .models import ImageUpload
+
+
+def claim_uploads(limit, lease_seconds=None):
+    """Return up to limit due uploads, leased away from other workers."""
+    if lease_seconds is None:
+        lease_seconds = getattr(settings, "IMAGE_UPLOAD_LEASE", 300)
+    return job_queue.claim(
+        ImageUpload.objects.select_related("content_type").defer(
+            "staged_data"
+        ),
+        limit,
+        lease_seconds,
+    )
+
+
+def _current(upload):
+    # Guarded on staged_name: a newer upload for the same field may have
+    # replaced this one while it was being stored
+
+    return ImageUpload.objects.filter(
+        id=upload.id, staged_name=upload.staged_name
+    )
+
+
+def _drop(upload):
+    _current(upload).delete()
+
+
+def _finish(upload, value):
+    model = upload.content_type.model_class()
+    with transaction.atomic():
+        target = (
+            model.objects.select_for_update().filter(pk=upload.object_id).first()
+        )
+        if target is not None and _current(upload).exists():
+            setattr(target, upload.field_name, value)
+
+            # Full save so signals refresh search documents and card versions
+
+            target.save()
+    _drop(upload)
+
+
+def _retry(upload, error):
+    if not job_queue.retry(
+        _current(upload),
+        upload,
+        error,
+        getattr(settings, "IMAGE_UPLOAD_MAX_ATTEMPTS", 5),
+    ):
+        _drop(upload)
+
+
+def process_uploads(uploads):
+    """
+    Store a batch of claimed uploads. Returns a dict of stored / rejected /
+    retried counts.
+    """
+    counts = {"stored": 0, "rejected": 0, "retried": 0}
+    backend = get_image_backend()
+    for upload in uploads:
+        # Loaded one at a time, and only while this upload is still current:
+        # a newer upload for the same field replaces it and is queued itself
+
+        data = _current(upload).values_list("staged_data", flat=True).first()
+        if data is None:
+            continue
+        if not data:
+            _retry(upload, "Staged image data is missing")
+            counts["retried"] += 1
+            continue
+        try:
+            value = backend.store(BytesIO(data))
+        except InvalidImage:
+            _drop(upload)
+            counts["rejected"] += 1
+            continue
+        except Exception as exc:
+            _retry(upload, exc)
+            counts["retried"] += 1
+            continue
+        _finish(upload, value)
+        counts["stored"] += 1
+    return counts
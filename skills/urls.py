@@ -27,6 +27,11 @@ urlpatterns = [
         views.conversation_detail,
         name="conversation_detail",
     ),
+    path(
+        "conversations/<int:conversation_id>/stream/",
+        views.conversation_stream,
+        name="conversation_stream",
+    ),
     path(
         "listing/<int:listing_id>/delete/",
         views.delete_listing,
@@ -38,4 +43,7 @@ urlpatterns = [
         name="delete_review",
     ),
     path("profile/delete/", views.delete_profile, name="delete_profile"),
+    path(
+        "metrics/requests/", views.request_metrics, name="request_metrics"
+    ),
 ]
@@ -0,0 +1,51 @@
+"""
+Version stamps that retire a whole family of cache entries at once, in
+every process.
+
+A namespace's current version lives in the "shared" cache, so a bump made by
+one process reaches the others. On PostgreSQL that cache is a table on the
+primary, too slow to read on every request, so each process also keeps the
+version it last read for SHARED_VERSION_TTL seconds: a bump made elsewhere is
+seen within that window, one made by this process at once.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class VersionedNamespace:
+    def __init__(self, key):
+        self.key = key
+        self._lock = threading.Lock()
+        self._version = None
+        self._expires = 0.0
+
+    def current(self):
+        """Return the namespace's version, from process memory if fresh."""
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and self._expires > now:
+                return self._version
+        shared = caches["shared"]
+        version = shared.get(self.key)
+        if version is None:
+            shared.add(self.key, uuid.uuid4().hex, None)
+            version = shared.get(self.key)
+        self._remember(version, now)
+        return version
+
+    def bump(self):
+        """Store a new version, retiring everything keyed by the old one."""
+        version = uuid.uuid4().hex
+        caches["shared"].set(self.key, version, None)
+        self._remember(version, time.monotonic())
+        return version
+
+    def _remember(self, version, now):
+        with self._lock:
+            self._version = version
+            self._expires = now + getattr(settings, "SHARED_VERSION_TTL", 5)
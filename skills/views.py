@@ -1,12 +1,33 @@
-from django.http import HttpResponse
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.db.models import Avg, Count
+from django.db import connection, transaction
+from django.db.models import OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.urls import reverse
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+from .geo import locations_within, within_bounding_box
+from .geocoding import geocode
+from .images import queue_images, stage_images
+from .pubsub import conversation_channel, get_broker
+from .replicas import use_replica
+from . import (
+    fragments,
+    geocoding,
+    metrics,
+    replicas,
+    search_cache,
+    search_index,
+)
 from .models import (
     Profile,
     Listing,
@@ -14,7 +35,9 @@ from .models import (
     Skill,
     Review,
     Conversation,
+    GeocodeJob,
     Message,
+    UnreadCounter,
 )
 from .forms import (
     ProfileForm,
@@ -27,30 +50,53 @@ from .forms import (
 # Create your views here.
 
 
+@use_replica
 def home(request):
     return render(request, "skills/home.html")
 
 
 @login_required
 def profile_view(request):
-    profile, _ = Profile.objects.get_or_create(user=request.user)
+    # Through request.user so the page and base template share one cached
+    # profile (with its user) instead of loading them again
+
+    try:
+        profile = request.user.profile
+    except Profile.DoesNotExist:
+        profile = Profile.objects.create(user=request.user)
     # Fetch listings using the related_name you defined
 
     my_listings = profile.listings.all().select_related("skill", "location")
     conversations = (
         Conversation.objects.filter(participants=profile)
-        .select_related("listing", "listing__skill")
-        .prefetch_related("participants", "messages")
+        .select_related("listing", "listing__skill", "last_message")
+        .prefetch_related(
+            Prefetch(
+                "participants",
+                queryset=Profile.objects.select_related("user"),
+            )
+        )
+        .annotate(
+            unread=Coalesce(
+                Subquery(
+                    UnreadCounter.objects.filter(
+                        conversation=OuterRef("pk"), profile=profile
+                    ).values("count")[:1]
+                ),
+                0,
+            )
+        )
         .order_by("-updated_at")
     )
 
-    # Build a light “inbox” list with last message (avoids template query surprises)
+    # Build a light “inbox” list with last message (avoids template query surprises).
+    # The last message is a stored pointer and participants are prefetched,
+    # so this costs the same few queries however many conversations exist
 
-    inbox = []
-    for c in conversations:
-        other = c.other_participant(profile)
-        last_msg = c.messages.order_by("-created_at").first()
-        inbox.append((c, other, last_msg))
+    inbox = [
+        (c, c.other_participant(profile), c.last_message)
+        for c in conversations
+    ]
     return render(
         request,
         "skills/profile.html",
@@ -69,16 +115,81 @@ def edit_profile(request):
     if request.method == "POST":
         form = ProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
+            # A new image is stored in the background (see skills.images)
+
+            staged = stage_images(form)
             form.save()
+            queue_images(profile, staged)
             messages.success(
                 request, "Your profile has been updated successfully!"
             )
+            if staged:
+                messages.info(
+                    request, "Your new photo will appear in a moment."
+                )
             return redirect("profile")
     else:
         form = ProfileForm(instance=profile)
     return render(request, "skills/edit_profile.html", {"form": form})
 
 
+LOCATION_NOT_FOUND_ERROR = (
+    "Could not find that location. Try a full postcode or town/city name."
+)
+
+# Shown when no geocoder answered in time: a slow or failing backend, or one
+# at its rate limit, which request paths never wait for
+
+LOCATION_BUSY_ERROR = (
+    "We can't look up that location right now. Please try again in a moment."
+)
+
+
+def _check_location(form, unchanged=None):
+    """
+    Return False, with an error on the form, when the typed location is a
+    place already known not to exist (by the gazetteer, or a cached miss),
+    so only places never looked up go to the background geocoder. A
+    location left as `unchanged` is not checked again.
+    """
+    location_text = form.cleaned_data["location_text"].strip()
+    if location_text == unchanged:
+        return True
+    if geocoding.geocode_local(location_text) is geocoding.MISS:
+        form.add_error("location_text", LOCATION_NOT_FOUND_ERROR)
+        return False
+    return True
+
+
+def _apply_location(listing, location_text):
+    """
+    Attach the Location for location_text when it is already known locally
+    (gazetteer, stored locations, geocode cache); otherwise mark the listing
+    pending so the background worker geocodes it. Never waits on a remote
+    geocoder. Returns True when a GeocodeJob must be queued.
+    """
+    geo = geocode(location_text, remote=False)
+    if geo is None:
+        listing.queue_geocoding(location_text)
+        return True
+    loc_obj, _ = Location.objects.get_or_create(
+        name=location_text,
+        defaults={"latitude": geo.latitude, "longitude": geo.longitude},
+    )
+    listing.set_location(loc_obj)
+    return False
+
+
+def _save_listing(listing, queue_geocoding):
+    """Save listing and add or drop its GeocodeJob to match."""
+    with transaction.atomic():
+        listing.save()
+        if queue_geocoding:
+            GeocodeJob.enqueue(listing)
+        else:
+            GeocodeJob.objects.filter(listing=listing).delete()
+
+
 @login_required
 def create_listing(request):
     profile = request.user.profile
@@ -91,56 +202,133 @@ def create_listing(request):
         return redirect("edit_profile")
     if request.method == "POST":
         form = ListingForm(request.POST, request.FILES)
-        if form.is_valid():
+        if form.is_valid() and _check_location(form):
             listing = form.save(commit=False)
 
+            # Unknown places are geocoded in the background, so the listing
+            # is saved straight away either way
+
             location_text = form.cleaned_data["location_text"].strip()
-            geo = Nominatim(user_agent="skillshop").geocode(location_text)
+            queued = _apply_location(listing, location_text)
+            listing.provider = profile
 
-            if not geo:
-                form.add_error(
-                    "location_text",
-                    "Could not find that location. Try a postcode or full town/city name.",
-                )
-            else:
-                loc_obj, _ = Location.objects.get_or_create(
-                    name=location_text,
-                    defaults={
-                        "latitude": geo.latitude,
-                        "longitude": geo.longitude,
-                    },
-                )
-                listing.location = loc_obj
-                listing.provider = profile
-                listing.save()
-                messages.success(
+            # Photos are staged and stored in the background as well
+
+            staged = stage_images(form)
+            _save_listing(listing, queued)
+            queue_images(listing, staged)
+
+            messages.success(
+                request,
+                f"Success! Your listing '{listing.skill.name}' has been published.",
+            )
+            if queued:
+                messages.info(
                     request,
-                    f"Success! Your listing '{listing.skill.name}' has been published.",
+                    f"We're looking up \"{location_text}\"; your listing will "
+                    "show in location searches once it's found.",
                 )
-                return redirect("home")
+            if staged:
+                messages.info(
+                    request, "Your photos will appear once they're processed."
+                )
+            return redirect("home")
     else:
         form = ListingForm()
     return render(request, "skills/create_listing.html", {"form": form})
 
 
-def search(request):
-
+def _search_queryset(skill_q, keywords_q):
+    """
+    Active listings matching the skill and keyword filters, best keyword
+    match first when searching by keywords.
+    """
     listings = (
         Listing.objects.select_related(
             "skill", "provider", "provider__user", "location"
         )
         .filter(is_active=True)
-        .annotate(
-            avg_rating=Avg("reviews__rating"), review_count=Count("reviews")
-        )
     )
-    form = ListingForm(
-        request.GET, search_mode=True
-    )  # Pass search_mode=True to the form to adjust its behavior
+    if skill_q:
+        listings = listings.filter(skill_id=skill_q)
+    if keywords_q:
+        matches = search_index.match_listings(listings, keywords_q)
+        if matches is None:
+            # Database without full-text support
+
+            listings = listings.filter(
+                Q(description__icontains=keywords_q)
+                | Q(skill__name__icontains=keywords_q)
+            )
+        else:
+            listings = matches
+    return listings
+
+
+def _fetch_candidates(skill_q, keywords_q):
+    """Sync helper: the filtered listings, loaded."""
+    return list(_search_queryset(skill_q, keywords_q))
+
+
+def _search_results(skill_q, keywords_q, user_coords, r_miles, fetched=None):
+    """
+    Run the search pipeline: filter, keyword match, bounding box and
+    distance. Returns [(listing, miles or None), ...] in display order.
+
+    fetched is a _fetch_candidates() result loaded before the location was
+    known; distances then filter it instead of a bounding-box query.
+    """
+    if fetched is not None:
+        candidates = fetched
+    else:
+        candidates = _search_queryset(skill_q, keywords_q)
+        if user_coords:
+            # Narrow candidates in the database to the radius' bounding box
+            # so the exact distance is only computed for nearby listings
+
+            candidates = candidates.filter(
+                within_bounding_box(user_coords, r_miles)
+            )
+
+    results = []
+    if user_coords:
+        candidates = list(candidates)
+
+        # Many listings share a Location: measure each place once, then fan
+        # the distance out to its listings
+
+        locations = {
+            listing.location_id: (
+                listing.location.latitude,
+                listing.location.longitude,
+            )
+            for listing in candidates
+        }
+        nearby = locations_within(user_coords, locations, r_miles)
+        for listing in candidates:
+            d_miles = nearby.get(listing.location_id)
+            if d_miles is not None:
+                results.append((listing, d_miles))
+        results.sort(key=lambda x: x[1])
+    else:
+        # No location filtering, just show all results (best keyword match
+        # first, as the queryset is ordered)
+
+        for listing in candidates:
+            results.append((listing, None))  # No distance
+    return results
+
+
+def _search_params(request):
+    """Read the search form from the query string (no database access)."""
     # skill_q = request.GET.get("skill", "").strip()
 
     skill_q = request.GET.get("skill_choice") or request.GET.get("skill")
 
+    # Free-text keywords (description, skill name, provider name)
+
+    keywords_q = request.GET.get("q", "").strip()
+
     location_q = request.GET.get("location", "").strip()
 
     # miles (default 15)
@@ -152,8 +340,6 @@ def search(request):
     lat = request.GET.get("lat")
     lon = request.GET.get("lon")
 
-    if skill_q:
-        listings = listings.filter(skill_id=skill_q)
     try:
         r_miles = float(radius_miles)
     except ValueError:
@@ -164,9 +350,6 @@ def search(request):
     user_coords = None
     location_error = None
 
-    # Determine whether the user attempted location filtering at all
-    # attempted_location_filter = bool(location_q) or (lat and lon)
-
     # Browser coordinates if present
 
     if lat and lon:
@@ -174,51 +357,193 @@ def search(request):
             user_coords = (float(lat), float(lon))
         except ValueError:
             location_error = "Could not read your browser location."
+    return {
+        "skill_q": skill_q,
+        "keywords_q": keywords_q,
+        "location_q": location_q,
+        "radius_miles": radius_miles,
+        "r_miles": r_miles,
+        "user_coords": user_coords,
+        "location_error": location_error,
+        "geocoded": False,
+    }
+
+
+def _search_page(request, params, fetched=None):
+    """Sync part of search: geocode if still needed, then render results."""
+    form = ListingForm(
+        request.GET, search_mode=True
+    )  # Pass search_mode=True to the form to adjust its behavior
+    skill_q = params["skill_q"]
+    keywords_q = params["keywords_q"]
+    location_q = params["location_q"]
+    r_miles = params["r_miles"]
+    user_coords = params["user_coords"]
+    location_error = params["location_error"]
+
     # OFallback: geocode typed location
 
-    if not user_coords and location_q:
-        geolocator = Nominatim(user_agent="skillshop")
-        geo = geolocator.geocode(location_q)
-        if geo:
-            user_coords = (geo.latitude, geo.longitude)
+    if not user_coords and location_q and not params["geocoded"]:
+        try:
+            geo = geocode(location_q, strict=True, block=False)
+        except geocoding.GeocoderUnavailable:
+            location_error = LOCATION_BUSY_ERROR
         else:
-            location_error = "Could not find that location. Try a full postcode or town/city name."
-    results = []
+            if geo:
+                user_coords = (geo.latitude, geo.longitude)
+            else:
+                location_error = LOCATION_NOT_FOUND_ERROR
+
+    # Identical searches reuse the ordered ids (and distances) of the last
+    # run until a listing, review or location changes
+
     if user_coords:
-        for listing in listings:
-            if not listing.location:
-                continue
-            listing_coords = (
-                listing.location.latitude,
-                listing.location.longitude,
-            )
-            d_miles = geodesic(user_coords, listing_coords).miles
-            if d_miles <= r_miles:
-                listing.avg_rating_int = int(listing.avg_rating or 0)
-                results.append((listing, d_miles))
-        results.sort(key=lambda x: x[1])
+        sort = "distance"
+    elif keywords_q:
+        sort = "relevance"
     else:
-        # No location filtering, just show all results with avg_rating_int annotated for star display
+        sort = "newest"
+    cache_key = search_cache.make_key(
+        skill_q, keywords_q, user_coords, r_miles, sort
+    )
+    # A browser pinned to the primary skips results a replica may have
+    # cached before its own write, and refreshes them
 
-        for listing in listings:
-            listing.avg_rating_int = int(listing.avg_rating or 0)
-            results.append((listing, None))  # No distance
-    # Filter by distance (uses listing.location coords)
+    entries = None if replicas.is_pinned() else search_cache.get(cache_key)
+    if entries is None:
+        results = _search_results(
+            skill_q, keywords_q, user_coords, r_miles, fetched
+        )
+        entries = [
+            (listing.id, listing.version, dist) for listing, dist in results
+        ]
+        # A lagging replica may not have the change that bumped the version
+        # yet, so its results are only cached for as long as the lag
+
+        search_cache.set(
+            cache_key,
+            entries,
+            replicas.max_lag() if replicas.reading_replica() else None,
+        )
+        found = {listing.id: listing for listing, _ in results}
+
+        def load_listings(ids):
+            return {i: found[i] for i in ids}
+
+    else:
+        # Keep only listings still active, at their current version: the
+        # entries may predate a change whose invalidation has not reached
+        # this cache yet
+
+        current = dict(
+            Listing.objects.filter(
+                id__in=[listing_id for listing_id, _, _ in entries],
+                is_active=True,
+            ).values_list("id", "version")
+        )
+        entries = [
+            (listing_id, current[listing_id], dist)
+            for listing_id, _, dist in entries
+            if listing_id in current
+        ]
+
+        def load_listings(ids):
+            return (
+                Listing.objects.select_related(
+                    "skill", "provider", "provider__user", "location"
+                )
+                .filter(is_active=True)
+                .in_bulk(ids)
+            )
+
+    # Cards come from the fragment cache in one multi-get; on a cached
+    # search with warm cards only the active check reads the listings
+
+    cards = fragments.render_listing_cards(entries, load_listings)
 
     return render(
         request,
         "skills/search.html",
         {
-            "results": results,
+            "cards": cards,
             "skill_q": skill_q,
+            "keywords_q": keywords_q,
             "location_q": location_q,
-            "radius_miles": radius_miles,
+            "radius_miles": params["radius_miles"],
             "location_error": location_error,
             "form": form,
         },
     )
 
 
+async def _geocode_concurrently(params):
+    """
+    Resolve the typed location for an ASGI request. Places not known
+    locally are looked up remotely (with a timeout) while the skill or
+    keyword matches load; returns those matches, or None if not loaded.
+    Cancelling the request cancels whatever is still pending.
+    """
+    location_q = params["location_q"]
+    geo = await sync_to_async(geocoding.geocode_local)(location_q)
+    fetched = None
+    unavailable = False
+    if geo is None and await sync_to_async(geocoding.has_remote_backends)():
+        tasks = [asyncio.ensure_future(geocoding.ageocode(location_q))]
+
+        # Without a skill or keywords the matches are the whole catalogue,
+        # better narrowed by a bounding box once the place is known
+
+        if params["skill_q"] or params["keywords_q"]:
+            tasks.append(
+                asyncio.ensure_future(
+                    sync_to_async(_fetch_candidates)(
+                        params["skill_q"], params["keywords_q"]
+                    )
+                )
+            )
+        try:
+            try:
+                geo = await tasks[0]
+            except (TimeoutError, geocoding.GeocoderUnavailable):
+                unavailable = True
+            if len(tasks) > 1:
+                fetched = await tasks[1]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    params["geocoded"] = True
+    if geo and geo is not geocoding.MISS:
+        params["user_coords"] = (geo.latitude, geo.longitude)
+    elif unavailable:
+        params["location_error"] = LOCATION_BUSY_ERROR
+    else:
+        params["location_error"] = LOCATION_NOT_FOUND_ERROR
+    return fetched
+
+
+@use_replica
+async def search(request):
+    """
+    Search active listings by skill, keywords and distance from a typed
+    location or the browser's coordinates.
+
+    An async view: under ASGI a typed location that needs a remote lookup
+    parks a coroutine rather than a worker thread, and the wait is bounded
+    by settings.GEOCODER_ASYNC_TIMEOUT. Under WSGI everything runs in one
+    sync call, as before.
+    """
+    params = _search_params(request)
+    fetched = None
+    if (
+        isinstance(request, ASGIRequest)
+        and params["location_q"]
+        and not params["user_coords"]
+    ):
+        fetched = await _geocode_concurrently(params)
+    return await sync_to_async(_search_page)(request, params, fetched)
+
+
 @login_required
 def edit_listing(request, listing_id):
     listing = get_object_or_404(Listing, id=listing_id)
@@ -226,39 +551,42 @@ def edit_listing(request, listing_id):
     if listing.provider != request.user.profile:
         raise PermissionDenied
     initial = {
-        "location_text": listing.location.name if listing.location else ""
+        "location_text": (
+            listing.location.name
+            if listing.location
+            else listing.location_query
+        )
     }
 
     if request.method == "POST":
         form = ListingForm(request.POST, request.FILES, instance=listing)
-        if form.is_valid():
+        unchanged = (
+            None
+            if listing.location_status == Listing.LOCATION_FAILED
+            else initial["location_text"]
+        )
+        if form.is_valid() and _check_location(form, unchanged):
             updated = form.save(commit=False)
 
-            # Geocoding logic
+            # Geocoding logic: only a changed location, or one whose lookup
+            # failed, is looked up again, in the background when it is not
+            # known locally
 
             location_text = form.cleaned_data.get("location_text", "").strip()
-            if location_text:
-                geolocator = Nominatim(user_agent="skillshop")
-                geo = geolocator.geocode(location_text)
-                if geo:
-                    loc_obj, _ = Location.objects.get_or_create(
-                        name=location_text,
-                        defaults={
-                            "latitude": geo.latitude,
-                            "longitude": geo.longitude,
-                        },
-                    )
-                    updated.location = loc_obj
-                else:
-                    form.add_error("location_text", "Location not found.")
-                    return render(
-                        request,
-                        "skills/edit_listing.html",
-                        {"form": form, "listing": listing},
-                    )
+            queued = None
+            if location_text and (
+                location_text != initial["location_text"]
+                or updated.location_status == Listing.LOCATION_FAILED
+            ):
+                queued = _apply_location(updated, location_text)
             # THE FIX: Save everything first
 
-            updated.save()
+            staged = stage_images(form)
+            if queued is None:
+                updated.save()
+            else:
+                _save_listing(updated, queued)
+            queue_images(updated, staged)
 
             # Add the message to the session
 
@@ -266,6 +594,16 @@ def edit_listing(request, listing_id):
                 request,
                 f'Changes to "{updated.skill.name}" saved successfully!',
             )
+            if queued:
+                messages.info(
+                    request,
+                    f"We're looking up \"{location_text}\"; the new location "
+                    "will show once it's found.",
+                )
+            if staged:
+                messages.info(
+                    request, "New photos will appear once they're processed."
+                )
 
             # Redirect to the Detail page so they see the carousel
 
@@ -282,6 +620,7 @@ def edit_listing(request, listing_id):
     )
 
 
+@use_replica(anonymous_only=True)
 def listing_detail(request, listing_id):
     listing = get_object_or_404(
         Listing.objects.select_related(
@@ -291,17 +630,14 @@ def listing_detail(request, listing_id):
         is_active=True,
     )
 
-    # Aggregate rating stats for this listing
+    # Rating stats are stored on the listing, no aggregate needed
 
-    rating_stats = listing.reviews.aggregate(
-        avg=Avg("rating"), count=Count("id")
-    )
+    rating_stats = {"avg": listing.avg_rating, "count": listing.review_count}
     reviews = listing.reviews.select_related(
         "reviewer", "reviewer__user"
     ).order_by("-created_at")
 
-    avg_rating = rating_stats["avg"] or 0
-    avg_rating_int = int(avg_rating)
+    avg_rating_int = listing.avg_rating_int
 
     # Initialize Permission Variables
 
@@ -352,11 +688,17 @@ def listing_detail(request, listing_id):
                     )
             else:
                 review_form = ReviewForm(instance=user_review)
+    is_owner = (
+        request.user.is_authenticated
+        and request.user.profile == listing.provider
+    )
     return render(
         request,
         "skills/listing_detail.html",
         {
             "listing": listing,
+            "is_owner": is_owner,
+            "fragment_timeout": settings.FRAGMENT_CACHE_TIMEOUT,
             "photos": listing.get_photos(),
             "reviews": reviews,
             "rating_stats": rating_stats,
@@ -396,21 +738,10 @@ def start_conversation(request, listing_id):
 
     if other == me:
         raise PermissionDenied
-    # Check if a conversation already exists between this user and the provider about this listing
-
-    existing = (
-        listing.conversations.filter(participants=me)
-        .filter(participants=other)
-        .first()
-    )
-    if existing:
-        return redirect("conversation_detail", conversation_id=existing.id)
-    # Create new conversation
+    # Reuse the conversation between this user and the provider about this
+    # listing, or create it (one indexed lookup on the participant-pair key)
 
-    conv = listing.conversations.create()
-    conv.participants.add(me)
-    conv.participants.add(other)
-    conv.save()
+    conv, _ = Conversation.get_or_start(listing, me, other)
 
     return redirect("conversation_detail", conversation_id=conv.id)
 
@@ -418,8 +749,13 @@ def start_conversation(request, listing_id):
 @login_required
 def conversation_detail(request, conversation_id):
     conv = get_object_or_404(
-        Conversation.objects.prefetch_related(
-            "participants", "messages__sender"
+        Conversation.objects.select_related(
+            "listing", "listing__skill", "listing__provider__user"
+        ).prefetch_related(
+            Prefetch(
+                "participants",
+                queryset=Profile.objects.select_related("user"),
+            )
         ),
         id=conversation_id,
     )
@@ -427,9 +763,6 @@ def conversation_detail(request, conversation_id):
 
     if me not in conv.participants.all():
         raise PermissionDenied
-    messages_qs = conv.messages.select_related(
-        "sender", "sender__user"
-    ).order_by("created_at")
     if request.method == "POST":
         form = MessageForm(request.POST)
         if form.is_valid():
@@ -440,6 +773,37 @@ def conversation_detail(request, conversation_id):
             return redirect("conversation_detail", conversation_id=conv.id)
     else:
         form = MessageForm()
+        # Opening the thread reads it: clear my counter and, only if there
+        # was anything unread, flag those messages in one bulk UPDATE
+
+        if UnreadCounter.objects.filter(
+            conversation=conv, profile=me, count__gt=0
+        ).update(count=0):
+            conv.messages.filter(is_read=False).exclude(sender=me).update(
+                is_read=True
+            )
+
+    # Only the newest page of the thread is loaded; older history is paged
+    # by keyset (?before=<message id>) along the (conversation, created_at)
+    # index, so page cost does not grow with the length of the thread
+
+    page = conv.messages.select_related("sender", "sender__user").order_by(
+        "-created_at", "-id"
+    )
+    before = request.GET.get("before", "")
+    anchor = (
+        conv.messages.filter(id=before).values("created_at", "id").first()
+        if before.isdigit()
+        else None
+    )
+    if anchor:
+        page = page.filter(
+            Q(created_at__lt=anchor["created_at"])
+            | Q(created_at=anchor["created_at"], id__lt=anchor["id"])
+        )
+    rows = list(page[: settings.MESSAGES_PAGE_SIZE + 1])
+    has_older = len(rows) > settings.MESSAGES_PAGE_SIZE
+    thread = rows[: settings.MESSAGES_PAGE_SIZE][::-1]  # oldest first
     other = conv.other_participant(me)
 
     # Logic for the dynamic back link
@@ -452,7 +816,11 @@ def conversation_detail(request, conversation_id):
         "skills/conversation_detail.html",
         {
             "conversation": conv,
-            "messages": messages_qs,  # oldest first
+            "messages": thread,  # oldest first
+            "oldest_id": thread[0].id if thread else None,
+            "newest_id": thread[-1].id if thread else 0,
+            "has_older": has_older,
+            "is_history": anchor is not None,
             "form": form,
             "other": other,
             "user_is_provider": user_is_provider,  # Added this
@@ -460,6 +828,113 @@ def conversation_detail(request, conversation_id):
     )
 
 
+def _stream_profile(request):
+    """Sync helper: the logged-in user's profile, or None."""
+    if request.user.is_authenticated:
+        return request.user.profile
+    return None
+
+
+async def conversation_stream(request, conversation_id):
+    """
+    Server-sent events feed of messages newer than the client's cursor
+    (?after=<message id>, or the Last-Event-ID header on reconnect).
+
+    Runs as an async view: under ASGI an idle stream only parks a coroutine
+    until the message writer publishes to the conversation channel (or the
+    keep-alive interval passes), instead of holding a worker thread.
+    """
+    me = await sync_to_async(_stream_profile)(request)
+    if me is None:
+        return redirect_to_login(request.get_full_path())
+    is_member = await Conversation.participants.through.objects.filter(
+        conversation_id=conversation_id, profile_id=me.id
+    ).aexists()
+    if not is_member:
+        raise PermissionDenied
+
+    cursor = request.headers.get("Last-Event-ID") or request.GET.get("after")
+    try:
+        cursor = int(cursor or 0)
+    except ValueError:
+        cursor = 0
+
+    def new_messages(after):
+        return list(
+            Message.objects.filter(
+                conversation_id=conversation_id, id__gt=after
+            )
+            .select_related("sender", "sender__user")
+            .order_by("id")[:100]
+        )
+
+    def event(msg):
+        data = {
+            "id": msg.id,
+            "mine": msg.sender_id == me.id,
+            "sender": msg.sender.display_name(),
+            "body": msg.body,
+            "created_at": msg.created_at.isoformat(),
+        }
+        return f"id: {msg.id}\ndata: {json.dumps(data)}\n\n"
+
+    def mark_read():
+        if UnreadCounter.objects.filter(
+            conversation_id=conversation_id, profile=me, count__gt=0
+        ).update(count=0):
+            Message.objects.filter(
+                conversation_id=conversation_id, is_read=False
+            ).exclude(sender=me).update(is_read=True)
+
+    def poll(after):
+        # Runs on a pooled thread, not one held for the stream, and hands
+        # its connection back before the stream goes idle: an open stream
+        # should cost neither a thread nor a database connection
+
+        try:
+            batch = new_messages(after)
+            if any(msg.sender_id != me.id for msg in batch):
+                mark_read()
+            return batch
+        finally:
+            connection.close()
+
+    async def stream(after):
+        broker = get_broker()
+        sub = broker.subscribe(conversation_channel(conversation_id))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MESSAGE_STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {settings.MESSAGE_STREAM_RETRY_MS}\n\n"
+            while loop.time() < deadline:
+                batch = await sync_to_async(poll, thread_sensitive=False)(
+                    after
+                )
+                for msg in batch:
+                    yield event(msg)
+                    after = msg.id
+                if not await sub.wait(settings.MESSAGE_STREAM_KEEPALIVE):
+                    # Also re-polls, covering writers in other processes
+                    yield ": keep-alive\n\n"
+        finally:
+            sub.close()
+
+    if isinstance(request, ASGIRequest):
+        content = stream(cursor)
+    else:
+        # A sync server would pin a worker for the whole stream: answer with
+        # what is new now and let EventSource reconnect (plain polling)
+
+        batch = await sync_to_async(new_messages)(cursor)
+        content = [f"retry: {settings.MESSAGE_STREAM_RETRY_MS}\n\n"]
+        content += [event(msg) for msg in batch]
+
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # delete listing view - provider only
 
 
@@ -487,3 +962,14 @@ def delete_profile(request):
         request, "Your account and all associated data have been deleted."
     )
     return redirect("home")
+
+
+@staff_member_required
+def request_metrics(request):
+    """Rolling per-view latency, SQL and geocoder percentiles (this process)."""
+    return JsonResponse(
+        {
+            "window": metrics.registry.window,
+            "views": metrics.registry.snapshot(),
+        }
+    )
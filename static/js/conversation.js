@@ -0,0 +1,51 @@
+// Live message delivery: append messages pushed by the conversation stream
+document.addEventListener("DOMContentLoaded", function () {
+    const list = document.getElementById("message-list");
+    const card = document.getElementById("message-card");
+    if (!list || !list.dataset.streamUrl || !window.EventSource) return;
+
+    const seen = new Set();
+
+    // --- Helper: format like the template's "d M H:i" ---
+    function formatDate(iso) {
+        const d = new Date(iso);
+        const day = String(d.getDate()).padStart(2, "0");
+        const month = d.toLocaleString("en-GB", { month: "short" });
+        const time = d.toLocaleTimeString("en-GB", { hour: "2-digit", minute: "2-digit" });
+        return `${day} ${month} ${time}`;
+    }
+
+    // --- Helper: build one message block (text only, never HTML) ---
+    function appendMessage(msg) {
+        if (seen.has(msg.id)) return;
+        seen.add(msg.id);
+
+        if (list.children.length) {
+            const hr = document.createElement("hr");
+            hr.className = "my-2";
+            list.appendChild(hr);
+        }
+        const wrapper = document.createElement("div");
+        wrapper.className = "mb-2";
+
+        const who = document.createElement("strong");
+        who.textContent = msg.mine ? "You" : msg.sender;
+        const when = document.createElement("small");
+        when.className = "text-muted";
+        when.textContent = " " + formatDate(msg.created_at);
+        const body = document.createElement("div");
+        msg.body.split("\n").forEach((line, i) => {
+            if (i) body.appendChild(document.createElement("br"));
+            body.appendChild(document.createTextNode(line));
+        });
+
+        wrapper.append(who, " ", when, body);
+        list.appendChild(wrapper);
+        card.classList.remove("d-none");
+        list.scrollTop = list.scrollHeight;
+    }
+
+    const url = `${list.dataset.streamUrl}?after=${list.dataset.lastId}`;
+    const source = new EventSource(url);
+    source.onmessage = (e) => appendMessage(JSON.parse(e.data));
+});